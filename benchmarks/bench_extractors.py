@@ -0,0 +1,223 @@
+# benchmarks/bench_extractors.py - Replay recorded product pages through every price extractor
+#
+# Usage: python -m benchmarks.bench_extractors [--repeat N] [--pages DIR] [--json] [--fail-under PCT]
+#
+# Runs fully offline against the corpus in benchmarks/pages, whose manifest
+# records the price each page should give (null when the page shows none).
+# The pages carry ratings, SKUs, shipping thresholds and other numbers around
+# the price, so the generic extractor's page-wide regexes have something to
+# get wrong. Misses the manifest lists under known_misses, with the reason,
+# still count against accuracy but are marked as known in the report.
+# For every parser backend it reports:
+#
+#   - parse latency percentiles over all pages, and the memory blocks and KB
+#     the parse tree holds (counted by tracemalloc while the tree is alive)
+#   - for each extractor, its accuracy against the expected prices, its
+#     latency percentiles on an already parsed page and its peak Python heap
+#
+# Retailer extractors only see their own retailer's pages. The generic
+# extractor sees every page, since it is the fallback for all of them.
+# extract_price_and_tier is the whole path a price check takes (structured
+# data, then parse and selectors), so its latency includes parsing.
+# Each backend runs in its own process, as in bench_parsers.
+
+import argparse
+import json
+import math
+import multiprocessing
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.bench_parsers import PAGES_DIR, load_pages
+
+# Extractor name -> retailer whose pages it runs on (None for every page)
+EXTRACTOR_RETAILERS = {
+    'extract_amazon_price': 'Amazon',
+    'extract_walmart_price': 'Walmart',
+    'extract_target_price': 'Target',
+    'extract_bestbuy_price': 'Best Buy',
+    'extract_generic_price': None,
+    'extract_price_and_tier': None
+}
+
+
+def percentile_ms(timings: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of a list of seconds, in ms."""
+    if not timings:
+        return 0.0
+
+    ordered = sorted(timings)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank] * 1000
+
+
+def prices_match(price: Optional[float], expected: Optional[float]) -> bool:
+    if price is None or expected is None:
+        return price is None and expected is None
+    return abs(price - expected) < 0.005
+
+
+def measure(call: Callable[[], Any], repeat: int, timings: List[float]) -> Any:
+    """Time a call repeat times, appending to timings, and return its last result."""
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        timings.append(time.perf_counter() - started)
+    return result
+
+
+def run_backend(backend: str, pages_dir: str, repeat: int) -> Dict[str, Any]:
+    """Replay every page through one backend and every extractor. Runs in a child process."""
+    from utils import price_tracker
+    from utils.html_parser import parse_html
+
+    pages = load_pages(pages_dir)
+    parse_timings: List[float] = []
+    tree_blocks: List[int] = []
+    tree_kb: List[float] = []
+    extractors = {
+        name: {'pages': 0, 'correct': 0, 'timings': [], 'peak_heap_kb': 0.0, 'misses': []}
+        for name in EXTRACTOR_RETAILERS
+    }
+
+    for page in pages:
+        html, retailer = page['html'], page['retailer']
+        measure(lambda: parse_html(html, backend), repeat, parse_timings)
+
+        # Count what the tree holds while it is still alive
+        tracemalloc.start()
+        soup = parse_html(html, backend)
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        stats = snapshot.statistics('filename')
+        tree_blocks.append(sum(stat.count for stat in stats))
+        tree_kb.append(sum(stat.size for stat in stats) / 1024)
+
+        for name, extractor_retailer in EXTRACTOR_RETAILERS.items():
+            if extractor_retailer is not None and extractor_retailer != retailer:
+                continue
+
+            if name == 'extract_price_and_tier':
+                def call():
+                    return price_tracker.extract_price_and_tier(html, retailer, backend)[0]
+            else:
+                # Bound now: the loop deletes soup before the next page
+                def call(extractor=getattr(price_tracker, name), soup=soup):
+                    return extractor(soup)
+
+            result = extractors[name]
+            price = measure(call, repeat, result['timings'])
+
+            tracemalloc.start()
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            result['pages'] += 1
+            result['peak_heap_kb'] = max(result['peak_heap_kb'], peak / 1024)
+            if prices_match(price, page['expected_price']):
+                result['correct'] += 1
+            else:
+                result['misses'].append({
+                    'file': page['file'],
+                    'expected': page['expected_price'],
+                    'price': price,
+                    'known': page.get('known_misses', {}).get(name)
+                })
+
+        del soup
+
+    report = {
+        'parse': {
+            'pages': len(pages),
+            'p50_ms': percentile_ms(parse_timings, 50),
+            'p95_ms': percentile_ms(parse_timings, 95),
+            'p99_ms': percentile_ms(parse_timings, 99),
+            'tree_blocks_max': max(tree_blocks, default=0),
+            'tree_blocks_total': sum(tree_blocks),
+            'tree_kb_max': max(tree_kb, default=0.0)
+        },
+        'extractors': {}
+    }
+    for name, result in extractors.items():
+        report['extractors'][name] = {
+            'pages': result['pages'],
+            'correct': result['correct'],
+            'accuracy': result['correct'] / result['pages'] if result['pages'] else 0.0,
+            'p50_ms': percentile_ms(result['timings'], 50),
+            'p95_ms': percentile_ms(result['timings'], 95),
+            'p99_ms': percentile_ms(result['timings'], 99),
+            'peak_heap_kb': result['peak_heap_kb'],
+            'misses': result['misses']
+        }
+    return report
+
+
+def print_report(reports: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'parse':<24} {'backend':<12} {'pages':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max blocks':>11} {'total blocks':>13} {'max KB':>8}")
+    for backend, report in reports.items():
+        parse = report['parse']
+        print(f"{'':<24} {backend:<12} {parse['pages']:>6} {parse['p50_ms']:>8.2f} {parse['p95_ms']:>8.2f} "
+              f"{parse['p99_ms']:>8.2f} {parse['tree_blocks_max']:>11} {parse['tree_blocks_total']:>13} "
+              f"{parse['tree_kb_max']:>8.0f}")
+
+    print()
+    print(f"{'extractor':<24} {'backend':<12} {'pages':>6} {'accuracy':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'peak KB':>8}")
+    for name in EXTRACTOR_RETAILERS:
+        for backend, report in reports.items():
+            result = report['extractors'][name]
+            print(f"{name:<24} {backend:<12} {result['pages']:>6} {result['accuracy']:>8.0%} "
+                  f"{result['p50_ms']:>8.3f} {result['p95_ms']:>8.3f} {result['p99_ms']:>8.3f} "
+                  f"{result['peak_heap_kb']:>8.0f}")
+
+    misses = [
+        (name, backend, miss)
+        for backend, report in reports.items()
+        for name, result in report['extractors'].items()
+        for miss in result['misses']
+    ]
+    if misses:
+        print()
+        print('Misses:')
+        for name, backend, miss in misses:
+            known = f" (known: {miss['known']})" if miss['known'] else ''
+            print(f"  {name:<24} {backend:<12} {miss['file']:<36} "
+                  f"expected {miss['expected']}, got {miss['price']}{known}")
+
+
+def main() -> None:
+    from utils.html_parser import available_backends
+
+    parser = argparse.ArgumentParser(description='Replay recorded pages through every price extractor')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages', default=PAGES_DIR)
+    parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+    parser.add_argument('--fail-under', type=float,
+                        help='Exit 1 if extract_price_and_tier accuracy (percent) falls below this on any backend')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    reports = {}
+    for backend in available_backends():
+        with context.Pool(1) as pool:
+            reports[backend] = pool.apply(run_backend, (backend, args.pages, args.repeat))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_report(reports)
+
+    if args.fail_under is not None:
+        accuracy = min(report['extractors']['extract_price_and_tier']['accuracy'] for report in reports.values())
+        if accuracy * 100 < args.fail_under:
+            print(f"extract_price_and_tier accuracy {accuracy:.0%} is below {args.fail_under}%")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_parsers.py - Compare HTML parser backends on recorded product pages
+#
+# Usage: python -m benchmarks.bench_parsers [--repeat N] [--pages DIR]
+#
+# Structured-data lookup is skipped so every page goes through the parser.
+# Each backend runs in its own process so peak RSS isn't shared between them.
+# Peak Python heap comes from tracemalloc; it doesn't see memory allocated
+# inside lxml or selectolax, which is what the RSS column is for.
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), 'pages')
+
+
+def load_pages(pages_dir: str) -> List[Dict[str, Any]]:
+    """Load the manifest and decompress every recorded page it lists."""
+    with open(os.path.join(pages_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    pages = []
+    for entry in manifest:
+        with gzip.open(os.path.join(pages_dir, entry['file']), 'rt', encoding='utf-8') as f:
+            pages.append({**entry, 'html': f.read()})
+    return pages
+
+
+def run_backend(backend: str, pages_dir: str, repeat: int) -> Dict[str, Any]:
+    """Time extraction of every page with one backend. Runs in a child process."""
+    from utils.price_tracker import extract_price_and_tier
+
+    pages = load_pages(pages_dir)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results = {}
+
+    for page in pages:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            price, _ = extract_price_and_tier(page['html'], page['retailer'], backend, scan_structured=False)
+            timings.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        extract_price_and_tier(page['html'], page['retailer'], backend, scan_structured=False)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[page['file']] = {
+            'price': price,
+            'median_ms': statistics.median(timings) * 1000,
+            'peak_heap_kb': peak / 1024
+        }
+
+    return {
+        'pages': results,
+        'rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    }
+
+
+def main() -> None:
+    from utils.html_parser import available_backends
+
+    parser = argparse.ArgumentParser(description='Compare HTML parser backends on recorded pages')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages', default=PAGES_DIR)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    context = multiprocessing.get_context('spawn')
+    reports = {}
+    for backend in backends:
+        with context.Pool(1) as pool:
+            reports[backend] = pool.apply(run_backend, (backend, args.pages, args.repeat))
+
+    reference = reports['html.parser']['pages']
+    print(f"{'page':<36} {'backend':<12} {'price':>10} {'median ms':>10} {'peak heap KB':>13} {'match':>6}")
+    for page in reference:
+        for backend in backends:
+            result = reports[backend]['pages'][page]
+            match = result['price'] == reference[page]['price']
+            print(f"{page:<36} {backend:<12} {str(result['price']):>10} "
+                  f"{result['median_ms']:>10.1f} {result['peak_heap_kb']:>13.0f} {'yes' if match else 'NO':>6}")
+
+    print()
+    for backend in backends:
+        total_ms = sum(result['median_ms'] for result in reports[backend]['pages'].values())
+        print(f"{backend:<12} total {total_ms:8.1f} ms   peak RSS growth {reports[backend]['rss_growth_kb']:>8} KB")
+
+
+if __name__ == '__main__':
+    main()
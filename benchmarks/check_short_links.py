@@ -0,0 +1,195 @@
+# benchmarks/check_short_links.py - Check the short link resolver against a local redirect server
+#
+# Usage: python -m benchmarks.check_short_links [--database NAME]
+#
+# Starts an aiohttp server on 127.0.0.1 that answers like a link shortener.
+# Short links use the server as localhost:PORT, which is registered as a
+# short link domain, and redirect to product pages on 127.0.0.1:PORT. Then
+# checks that:
+#
+#   - a 301 is followed with HEAD to the product page and the result cached
+#   - a second lookup is a cache hit that sends no request, until the
+#     cached entry is older than SHORT_LINK_TTL_DAYS
+#   - a redirector that rejects HEAD is followed with GET instead
+#   - a redirect to a missing page leaves the short link as it is
+#   - rewrite_short_link points a stored retailer link at the final URL and
+#     refreshes its product key, affiliate link and affiliate program
+#
+# Needs a MongoDB at MONGODB_URI; the database named by --database is dropped
+# before and after the run. Exits 1 if any check fails.
+
+import argparse
+import asyncio
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from aiohttp import web
+
+
+class FakeShortener:
+    """
+    Redirects /s/head to a product page with HEAD or GET, /s/nohead only
+    with GET (HEAD gets a 405), and /s/broken to a page that doesn't exist.
+    Counts requests by method and path.
+    """
+
+    def __init__(self):
+        self.requests: Counter = Counter()
+        self.product_url = ''
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests[(request.method, request.path)] += 1
+
+        if request.path == '/s/head':
+            raise web.HTTPMovedPermanently(f'{self.product_url}/amazon/dp/B000000001')
+        if request.path == '/s/nohead':
+            if request.method == 'HEAD':
+                raise web.HTTPMethodNotAllowed(request.method, ['GET'])
+            raise web.HTTPMovedPermanently(f'{self.product_url}/amazon/dp/B000000002')
+        if request.path == '/s/broken':
+            raise web.HTTPMovedPermanently(f'{self.product_url}/gone')
+        if request.path.startswith('/amazon/dp/'):
+            return web.Response(text='<html><body>product</body></html>', content_type='text/html')
+        raise web.HTTPNotFound()
+
+    async def start(self) -> Tuple[web.AppRunner, int]:
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        port = runner.addresses[0][1]
+        self.product_url = f'http://127.0.0.1:{port}'
+        return runner, port
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Check the short link resolver against a local redirect server')
+    parser.add_argument('--database', default='buyitforlife_short_links_sim')
+    args = parser.parse_args()
+
+    if not args.database.endswith('_sim'):
+        parser.error('--database must end in _sim; it is dropped before and after the run')
+    return args
+
+
+async def run_checks(args: argparse.Namespace) -> List[Tuple[str, bool]]:
+    from database.database import Item, RetailerLink, client, init_db
+    from utils import short_links
+    from utils.affiliate import generate_affiliate_link
+    from utils.http_client import start_http_session, close_http_session
+    from utils.product_urls import extract_product_key
+
+    server = FakeShortener()
+    runner, port = await server.start()
+    short_host = f'localhost:{port}'
+    short_url = f'http://{short_host}'
+    base_url = server.product_url
+    short_links.SHORT_LINK_DOMAINS.add(short_host)
+    results = []
+
+    def check(name: str, passed: bool) -> None:
+        results.append((name, passed))
+
+    try:
+        await client.drop_database(args.database)
+        await init_db()
+        await start_http_session()
+
+        # 301 followed with HEAD, then cached
+        final_url = await short_links.resolve_short_link(f'{short_url}/s/head')
+        check('HEAD follows the 301 to the product page', final_url == f'{base_url}/amazon/dp/B000000001')
+        check('HEAD is enough when the redirector accepts it',
+              server.requests[('HEAD', '/s/head')] == 1 and server.requests[('GET', '/s/head')] == 0)
+        check('resolved link is cached', await short_links.short_link_collection.count_documents(
+            {"_id": f'{short_url}/s/head', "final_url": final_url}) == 1)
+
+        hits_before = short_links.get_short_link_stats()["cache_hits"]
+        cached_url = await short_links.resolve_short_link(f'{short_url}/s/head')
+        check('fresh cache entry is reused', cached_url == final_url)
+        check('cache hit sends no request', server.requests[('HEAD', '/s/head')] == 1)
+        check('cache hit is counted', short_links.get_short_link_stats()["cache_hits"] == hits_before + 1)
+
+        # An entry older than the TTL is followed again
+        await short_links.short_link_collection.update_one(
+            {"_id": f'{short_url}/s/head'},
+            {"$set": {"resolved_at": datetime.now() - timedelta(days=short_links.SHORT_LINK_TTL_DAYS + 1)}}
+        )
+        await short_links.resolve_short_link(f'{short_url}/s/head')
+        check('expired cache entry is resolved again', server.requests[('HEAD', '/s/head')] == 2)
+
+        # HEAD rejected, GET followed
+        final_url = await short_links.resolve_short_link(f'{short_url}/s/nohead')
+        check('GET follows the redirect when HEAD is rejected', final_url == f'{base_url}/amazon/dp/B000000002')
+        check('GET is only sent after HEAD fails',
+              server.requests[('HEAD', '/s/nohead')] == 1 and server.requests[('GET', '/s/nohead')] == 1)
+
+        # Redirect to a missing page
+        failed_before = short_links.get_short_link_stats()["failed"]
+        broken_url = await short_links.resolve_short_link(f'{short_url}/s/broken')
+        check('unresolvable link is left as it is', broken_url == f'{short_url}/s/broken')
+        check('unresolvable link is counted as failed', short_links.get_short_link_stats()["failed"] == failed_before + 1)
+        check('unresolvable link is not cached',
+              await short_links.short_link_collection.count_documents({"_id": f'{short_url}/s/broken'}) == 0)
+
+        # Stored retailer link rewritten to the final URL
+        item = Item(
+            title='Short link check item',
+            reddit_id='short-link-check',
+            reddit_url='https://reddit.com/r/BuyItForLife/comments/short-link-check',
+            retailer_links=[RetailerLink(name='Amazon', url=f'{short_url}/s/nohead', affiliate_enabled=False)]
+        )
+        await item.insert()
+        link = item.retailer_links[0]
+        await short_links.rewrite_short_link(item, link)
+
+        stored = await Item.get(item.id)
+        stored_link = stored.retailer_links[0]
+        expected_key = extract_product_key(f'{base_url}/amazon/dp/B000000002', 'Amazon')
+        check('rewrite updates the link in memory', link.url == f'{base_url}/amazon/dp/B000000002')
+        check('rewrite stores the final URL', stored_link.url == f'{base_url}/amazon/dp/B000000002')
+        check('rewrite stores the product key', expected_key is not None and stored_link.product_key == expected_key)
+        check('rewrite uses the cached resolution', server.requests[('HEAD', '/s/nohead')] == 1)
+
+        # Affiliate link and program regenerated for the final URL
+        item = Item(
+            title='Short link affiliate check item',
+            reddit_id='short-link-affiliate-check',
+            reddit_url='https://reddit.com/r/BuyItForLife/comments/short-link-affiliate-check',
+            retailer_links=[RetailerLink(name='Amazon', url=f'{short_url}/s/head', affiliate_enabled=True,
+                                         affiliate_url=f'{short_url}/s/head?ref=stale', affiliate_program='stale')]
+        )
+        await item.insert()
+        await short_links.rewrite_short_link(item, item.retailer_links[0])
+
+        stored_link = (await Item.get(item.id)).retailer_links[0]
+        expected_affiliate = generate_affiliate_link(f'{base_url}/amazon/dp/B000000001', 'Amazon')
+        check('rewrite stores the affiliate link for the final URL', stored_link.affiliate_url == expected_affiliate)
+        check('rewrite stores the affiliate program that matches it',
+              stored_link.affiliate_program == ('amazon' if expected_affiliate else None))
+
+    finally:
+        await close_http_session()
+        await runner.cleanup()
+        await client.drop_database(args.database)
+
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    os.environ['DATABASE_NAME'] = args.database
+
+    results = asyncio.run(run_checks(args))
+    for name, passed in results:
+        print(f"{'ok' if passed else 'FAIL':<5} {name}")
+
+    if not all(passed for _, passed in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
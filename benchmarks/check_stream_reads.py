@@ -0,0 +1,139 @@
+# benchmarks/check_stream_reads.py - Check structured-data lookup on product pages read in chunks
+#
+# Usage: python -m benchmarks.check_stream_reads [--pages DIR]
+#
+# read_page_from_stream looks for a structured-data price after every chunk,
+# so a chunk that ends partway through a price tag must not give a price.
+# Starts an aiohttp server on 127.0.0.1 that serves small pages with the
+# price in JSON-LD, OpenGraph or microdata (both attribute orders), streams
+# each one at every chunk size from 1 byte to the page length, and checks
+# the price found is always the full one. Then streams the recorded corpus
+# at a few chunk sizes and checks the price matches a lookup on the whole
+# page. Needs no database. Exits 1 if any check fails.
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), 'pages')
+
+PRICE_TAGS = {
+    'json_ld': '<script type="application/ld+json">{"@type": "Product", "offers": {"@type": "Offer", "price": "1149.99", "priceCurrency": "USD"}}</script>',
+    'opengraph': '<meta property="og:price:amount" content="1149.99">',
+    'opengraph_reversed': '<meta content="1149.99" property="product:price:amount">',
+    'microdata': '<span itemprop="price" content="1,149.99">$1,149.99</span>',
+    'microdata_reversed': '<span content="1149.99" itemprop="price">$1,149.99</span>'
+}
+
+CORPUS_CHUNK_SIZES = [7, 64, 1024, 16384]
+
+
+class PageServer:
+    """Serves /<name> from a dict of page bodies."""
+
+    def __init__(self, pages: Dict[str, bytes]):
+        self.pages = pages
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = self.pages.get(request.match_info['name'])
+        if body is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=body, content_type='text/html', charset='utf-8')
+
+    async def start(self) -> Tuple[web.AppRunner, str]:
+        app = web.Application()
+        app.router.add_get('/{name}', self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        return runner, f'http://127.0.0.1:{runner.addresses[0][1]}'
+
+
+def load_corpus(pages_dir: str) -> Dict[str, bytes]:
+    with open(os.path.join(pages_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    pages = {}
+    for entry in manifest:
+        with gzip.open(os.path.join(pages_dir, entry['file']), 'rb') as f:
+            pages[entry['file'][:-len('.html.gz')]] = f.read()
+    return pages
+
+
+async def stream_price(base_url: str, name: str, chunk_size: int) -> Optional[float]:
+    """Read a served page through read_page_from_stream and return the structured-data price it found."""
+    from utils import price_tracker
+    from utils.check_timings import LinkTiming
+    from utils.http_client import get_http_session
+
+    price_tracker.PRICE_STREAM_CHUNK_SIZE = chunk_size
+    page = price_tracker.FetchedPage(f'{base_url}/{name}', 'Other', LinkTiming('Other'))
+    async with get_http_session().get(page.url) as response:
+        await price_tracker.read_page_from_stream(response, page)
+    return page.price
+
+
+async def run_checks(args: argparse.Namespace) -> List[Tuple[str, bool]]:
+    from utils.http_client import start_http_session, close_http_session
+    from utils.structured_data import find_structured_price
+
+    pages = {
+        name: f'<html><head><title>Check</title></head><body><h1>Item</h1>{tag}<p>In stock</p></body></html>'.encode()
+        for name, tag in PRICE_TAGS.items()
+    }
+    corpus = load_corpus(args.pages)
+    server = PageServer({**pages, **corpus})
+    runner, base_url = await server.start()
+    results = []
+
+    try:
+        await start_http_session()
+
+        for name, body in pages.items():
+            wrong = []
+            for chunk_size in range(1, len(body) + 1):
+                price = await stream_price(base_url, name, chunk_size)
+                if price != 1149.99:
+                    wrong.append((chunk_size, price))
+            results.append((f'{name}: full price at every chunk size'
+                            + (f' (got {wrong[:3]})' if wrong else ''), not wrong))
+
+        for name, body in corpus.items():
+            found = find_structured_price(body.decode('utf-8', errors='replace'))
+            expected = found[0] if found else None
+            wrong = []
+            for chunk_size in CORPUS_CHUNK_SIZES:
+                price = await stream_price(base_url, name, chunk_size)
+                if price != expected:
+                    wrong.append((chunk_size, price))
+            results.append((f'{name}: streamed price matches the whole page ({expected})'
+                            + (f' (got {wrong})' if wrong else ''), not wrong))
+
+    finally:
+        await close_http_session()
+        await runner.cleanup()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check structured-data lookup on product pages read in chunks')
+    parser.add_argument('--pages', default=PAGES_DIR)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_checks(args))
+    for name, passed in results:
+        print(f"{'ok' if passed else 'FAIL':<5} {name}")
+
+    if not all(passed for _, passed in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+# benchmarks/simulate_cycle.py - Run full price check cycles against a local fake retailer server
+#
+# Usage: python -m benchmarks.simulate_cycle [--items N] [--cycles N] [--latency-ms MS]
+#                                            [--error-rate P] [--price-change-rate P] [--json]
+#
+# Starts an aiohttp server that serves synthetic product pages for five
+# retailers, seeds N items (with users, subscribers and alerts) through the
+# Item/RetailerLink models in a throwaway database, and runs
+# check_prices_and_notify the given number of times. Outgoing email goes to
+# an in-process SMTP sink (aiosmtplib.send is replaced) so nothing is sent.
+#
+# Each cycle reports duration, fetches per second, Mongo commands per item
+# (counted with a pymongo command listener) and notifications per second,
+# along with the cycle's own summary. Needs a MongoDB at MONGODB_URI; the
+# database named by --database is dropped before seeding and after the run.
+#
+# Every retailer is served from 127.0.0.1, so HTTP_POOL_LIMIT_PER_HOST is
+# raised to HTTP_POOL_LIMIT unless set, and retailer rate limits are lifted
+# unless --retailer-rate is given.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from aiohttp import web
+from pymongo import monitoring
+
+# Product path per retailer; the first segment routes requests, the rest matches utils.product_urls
+RETAILER_PATHS = {
+    'Amazon': 'amazon/dp/B{id:09d}',
+    'Walmart': 'walmart/ip/sim-item/{id}',
+    'Target': 'target/p/sim-item/-/A-{id}',
+    'Best Buy': 'bestbuy/site/sim-item/{id}.p',
+    'REI': 'rei/product/{id}'
+}
+
+# Price markup per retailer, matching the selectors in utils.price_tracker
+PRICE_MARKUP = {
+    'Amazon': '<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">${price:.2f}</span></span></div>',
+    'Walmart': '<div class="prod-price"><span itemprop="price" content="{price:.2f}">${price:.2f}</span></div>',
+    'Target': '<div data-test="product-price">${price:.2f}</div>',
+    'Best Buy': '<div class="priceView-hero-price priceView-customer-price"><span aria-hidden="true">${price:,.2f}</span></div>',
+    'REI': '<div class="product-price"><span class="price-value">${price:.2f}</span></div>'
+}
+
+JSON_LD = ('<script type="application/ld+json">{{"@context":"https://schema.org","@type":"Product",'
+           '"offers":{{"@type":"Offer","price":"{price:.2f}","priceCurrency":"USD"}}}}</script>')
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Count every command the process sends to MongoDB, by command name."""
+
+    def __init__(self):
+        self.commands: Counter = Counter()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+class SmtpSink:
+    """Stands in for aiosmtplib.send: counts messages after an optional delay."""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.sent = 0
+
+    async def send(self, message, **kwargs) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent += 1
+
+
+class FakeRetailer:
+    """
+    Serves a synthetic product page for every product path in RETAILER_PATHS.
+
+    Each request waits latency_ms (+/- 50%), fails with a 503 at error_rate,
+    and changes the product's price at price_change_rate (mostly drops).
+    Pages carry an ETag per price, so unchanged pages can be answered with 304.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.latency = args.latency_ms / 1000
+        self.error_rate = args.error_rate
+        self.price_change_rate = args.price_change_rate
+        self.structured_ratio = args.structured_ratio
+        self.prices: Dict[str, Tuple[float, int]] = {}
+        self.requests: Counter = Counter()
+        self.filler = self.build_filler(args.page_kb * 1024)
+
+    @staticmethod
+    def build_filler(size: int) -> str:
+        words = 'durable lifetime warranty cast iron merino wool leather stitched repairable parts'.split()
+        rows = []
+        length = 0
+        while length < size:
+            row = f'<div class="row"><span class="lbl">{" ".join(random.choices(words, k=12))}</span></div>\n'
+            rows.append(row)
+            length += len(row)
+        return ''.join(rows)
+
+    def initial_price(self, path: str) -> float:
+        if path not in self.prices:
+            self.prices[path] = (round(random.uniform(10, 500), 2), 0)
+        return self.prices[path][0]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.path.lstrip('/')
+        retailer = next((name for name, fmt in RETAILER_PATHS.items() if path.startswith(fmt.split('/')[0] + '/')), None)
+        if retailer is None:
+            self.requests['not_found'] += 1
+            return web.Response(status=404)
+
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        if random.random() < self.error_rate:
+            self.requests['error'] += 1
+            return web.Response(status=503)
+
+        self.initial_price(path)
+        price, version = self.prices[path]
+        if random.random() < self.price_change_rate:
+            price = round(price * random.uniform(0.7, 1.1), 2)
+            version += 1
+            self.prices[path] = (price, version)
+
+        etag = f'"{abs(hash(path))}-{version}"'
+        if request.headers.get('If-None-Match') == etag:
+            self.requests['not_modified'] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+
+        self.requests['ok'] += 1
+        head = JSON_LD.format(price=price) if random.random() < self.structured_ratio else ''
+        half = len(self.filler) // 2
+        body = (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Sim product</title>{head}</head><body>'
+                f'{self.filler[:half]}{PRICE_MARKUP[retailer].format(price=price)}{self.filler[half:]}</body></html>')
+        return web.Response(text=body, content_type='text/html', headers={'ETag': etag})
+
+    async def start(self, port: int) -> Tuple[web.AppRunner, int]:
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        return runner, runner.addresses[0][1]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Simulate price check cycles against a fake retailer server')
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=None,
+                        help='Distinct products the items link to (default: one per item)')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--watched', type=float, default=0.2, help='Share of items with a subscriber and alert')
+    parser.add_argument('--cycles', type=int, default=2)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--price-change-rate', type=float, default=0.1)
+    parser.add_argument('--structured-ratio', type=float, default=0.5,
+                        help='Share of pages with a JSON-LD price')
+    parser.add_argument('--page-kb', type=int, default=200)
+    parser.add_argument('--smtp-latency-ms', type=float, default=300)
+    parser.add_argument('--retailer-rate', type=float, default=None,
+                        help='Requests per second per retailer (default: unlimited)')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--database', default='buyitforlife_sim')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    if not args.database.endswith('_sim'):
+        parser.error('--database must end in _sim; it is dropped before and after the run')
+    return args
+
+
+def apply_settings(args: argparse.Namespace) -> None:
+    """Point the app at the throwaway database and lift limits meant for real retailers."""
+    os.environ['DATABASE_NAME'] = args.database
+    os.environ.setdefault('HTTP_POOL_LIMIT_PER_HOST', os.getenv('HTTP_POOL_LIMIT', '100'))
+    rate = str(args.retailer_rate if args.retailer_rate else 1000000)
+    os.environ['RETAILER_DEFAULT_RATE'] = rate
+    os.environ['RETAILER_BURST'] = rate
+    os.environ['RETAILER_RATE_LIMITS'] = ''
+
+
+async def seed(args: argparse.Namespace, base_url: str, server: FakeRetailer) -> None:
+    """Insert the users, items and alerts the cycles will check."""
+    from database.database import Alert, Item, RetailerLink, User
+    from utils.product_urls import extract_product_key
+
+    users = [User(auth0_id=f'sim|{n}', email=f'sim{n}@example.com') for n in range(args.users)]
+    await User.insert_many(users)
+
+    retailers = list(RETAILER_PATHS)
+    products = args.products or args.items
+    items = []
+    for n in range(args.items):
+        product = n % products
+        retailer = retailers[product % len(retailers)]
+        path = RETAILER_PATHS[retailer].format(id=product)
+        url = f'{base_url}/{path}'
+        price = server.initial_price(path)
+        watched = random.random() < args.watched
+        items.append(Item(
+            title=f'Simulated item {n}',
+            reddit_id=f'sim{n}',
+            reddit_url=f'https://reddit.com/r/BuyItForLife/comments/sim{n}',
+            current_price=price,
+            retailer_links=[RetailerLink(
+                name=retailer,
+                url=url,
+                current_price=price,
+                product_key=extract_product_key(url, retailer),
+                affiliate_enabled=False
+            )],
+            subscribers=[f'sim|{random.randrange(args.users)}'] if watched and args.users else []
+        ))
+
+    for start in range(0, len(items), 1000):
+        await Item.insert_many(items[start:start + 1000])
+
+    inserted = await Item.find({"subscribers.0": {"$exists": True}}).to_list()
+    alerts = [Alert(user_id=item.subscribers[0], item_id=str(item.id)) for item in inserted]
+    if alerts:
+        await Alert.insert_many(alerts)
+
+
+def cycle_report(
+        stats: Dict[str, Any],
+        duration: float,
+        items: int,
+        requests: Counter,
+        commands: Counter,
+        notifications: int
+) -> Dict[str, Any]:
+    fetches = sum(requests.values())
+    db_ops = sum(commands.values())
+    return {
+        'duration_seconds': round(duration, 3),
+        'fetches': fetches,
+        'fetches_per_second': round(fetches / duration, 2) if duration > 0 else 0.0,
+        'responses': dict(requests),
+        'db_ops': db_ops,
+        'db_ops_per_item': round(db_ops / items, 2) if items else 0.0,
+        'db_commands': dict(commands.most_common()),
+        'notifications': notifications,
+        'notifications_per_second': round(notifications / duration, 2) if duration > 0 else 0.0,
+        'cycle': stats
+    }
+
+
+def print_report(reports: List[Dict[str, Any]]) -> None:
+    for number, report in enumerate(reports, 1):
+        cycle = report['cycle']
+        print(f"Cycle {number}: {report['duration_seconds']:.1f}s, "
+              f"{cycle.get('items_checked', 0)} items, {cycle.get('price_drops_found', 0)} drops")
+        print(f"  fetches          {report['fetches']:>8} ({report['fetches_per_second']:.1f}/s) {report['responses']}")
+        print(f"  db ops           {report['db_ops']:>8} ({report['db_ops_per_item']:.2f}/item) {report['db_commands']}")
+        print(f"  notifications    {report['notifications']:>8} ({report['notifications_per_second']:.2f}/s)")
+        print(f"  link latency     p50 {cycle.get('latency_p50', 0)}s  p95 {cycle.get('latency_p95', 0)}s  "
+              f"p99 {cycle.get('latency_p99', 0)}s")
+        for name, stage in cycle.get('stages', {}).items():
+            print(f"  stage {name:<10} {stage['workers']:>3} workers  peak queue {stage['peak_depth']:>4}  "
+                  f"{stage['per_second']:>8.1f}/s  utilization {stage['utilization']:.2f}")
+
+
+async def simulate(args: argparse.Namespace, counter: CommandCounter) -> List[Dict[str, Any]]:
+    import aiosmtplib
+    from database.database import client, init_db
+    from utils.http_client import start_http_session, close_http_session
+    from utils.parse_pool import shutdown_parse_executor
+    from utils.price_tracker import check_prices_and_notify
+
+    sink = SmtpSink(args.smtp_latency_ms)
+    aiosmtplib.send = sink.send
+
+    server = FakeRetailer(args)
+    runner, port = await server.start(args.port)
+    reports = []
+
+    try:
+        await client.drop_database(args.database)
+        await init_db()
+        await seed(args, f'http://127.0.0.1:{port}', server)
+        await start_http_session()
+
+        for _ in range(args.cycles):
+            server.requests.clear()
+            counter.commands.clear()
+            sent_before = sink.sent
+
+            started = time.perf_counter()
+            stats = await check_prices_and_notify()
+            duration = time.perf_counter() - started
+
+            reports.append(cycle_report(
+                stats, duration, args.items, Counter(server.requests), Counter(counter.commands), sink.sent - sent_before
+            ))
+
+    finally:
+        await close_http_session()
+        shutdown_parse_executor()
+        await runner.cleanup()
+        await client.drop_database(args.database)
+
+    return reports
+
+
+def main() -> None:
+    args = parse_args()
+    random.seed(args.seed)
+    apply_settings(args)
+
+    # Must be registered before the Mongo client is created on import
+    counter = CommandCounter()
+    monitoring.register(counter)
+
+    reports = asyncio.run(simulate(args, counter))
+
+    if args.json:
+        print(json.dumps(reports, indent=2, default=str))
+    else:
+        print_report(reports)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@
 
 import os
 import motor.motor_asyncio
-from beanie import Document, Indexed, Link, init_beanie
+from beanie import Document, Indexed, Link, PydanticObjectId, init_beanie
 from typing import List, Optional
 from pydantic import BaseModel, Field, EmailStr
 from datetime import datetime
@@ -39,6 +39,20 @@ class RetailerLink(BaseModel):
     price_dropped: bool = False
     last_checked: Optional[datetime] = None
 
+    # When the adaptive scheduler will check this link next
+    next_check_at: Optional[datetime] = None
+
+    # Retailer product id such as "amazon:B00006JSUA", shared by every URL for the product
+    product_key: Optional[str] = None
+
+    # Full price check run that last checked this link, see utils/price_runs.py
+    last_run_id: Optional[str] = None
+
+    # Affiliate link fields
+    affiliate_url: Optional[str] = None
+    affiliate_program: Optional[str] = None
+    affiliate_enabled: bool = True
+
 
 class UserNotified(BaseModel):
     user_id: str
@@ -75,9 +89,50 @@ class Item(Document, TimestampModel):
     subscribers: List[str] = []  # List of Auth0 user IDs
     is_on_sale: bool = False
 
+    # Price check worker currently holding this item, see utils/leases.py
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self.subscribers)
+
     class Settings:
         name = "items"
         use_revision = True
+        indexes = [
+            "retailer_links.product_key",
+            "retailer_links.next_check_at",
+            "lease_expires_at"
+        ]
+
+
+# Number of history entries used to measure volatility (utils/check_priority.py),
+# and so the most a price check reads
+VOLATILITY_WINDOW = 20
+
+
+class ItemPriceCheck(BaseModel):
+    """
+    The slice of an Item that a price check reads. Its size doesn't grow with
+    the item's price history or subscriber list.
+    """
+    id: PydanticObjectId = Field(alias="_id")
+    current_price: Optional[float] = None
+    price_history: List[PriceHistory] = []  # Last VOLATILITY_WINDOW entries only
+    retailer_links: List[RetailerLink] = []
+    subscriber_count: int = 0
+    is_on_sale: bool = False
+
+    class Settings:
+        projection = {
+            "_id": 1,
+            "current_price": 1,
+            "price_history": {"$slice": -VOLATILITY_WINDOW},
+            "retailer_links": 1,
+            "subscriber_count": {"$size": {"$ifNull": ["$subscribers", []]}},
+            "is_on_sale": 1
+        }
 
 
 class Alert(Document, TimestampModel):
@@ -57,6 +57,8 @@ class RetailerLinkModel(BaseModel):
     current_price: Optional[float] = None
     price_dropped: bool = False
     last_checked: Optional[datetime] = None
+    next_check_at: Optional[datetime] = None
+    product_key: Optional[str] = None
 
 
 class PriceHistoryModel(BaseModel):
@@ -1,7 +1,6 @@
 # main.py - Main FastAPI application with Auth0 integration
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.background import BackgroundScheduler
 import uvicorn
 import os
 from datetime import datetime
@@ -9,9 +8,10 @@ from dotenv import load_dotenv
 
 # Import local modules
 from database.database import init_db
-from routers import items, alerts
-from utils.reddit import fetch_reddit_items
-from utils.price_tracker import check_prices_and_notify
+from routers import items, alerts, prices
+from utils.jobs import start_scheduler
+from utils.http_client import start_http_session, close_http_session
+from utils.parse_pool import shutdown_parse_executor
 from auth.auth_config import auth
 
 # Load environment variables
@@ -36,42 +36,30 @@ app.add_middleware(
 # Include routers - No more need for the auth router since Auth0 handles that
 app.include_router(items.router, prefix="/api/items", tags=["Items"])
 app.include_router(alerts.router, prefix="/api/alerts", tags=["Alerts"])
+app.include_router(prices.router, prefix="/api/prices", tags=["Prices"])
 
 
 # Initialize database at startup
 @app.on_event("startup")
 async def startup_db_client():
     await init_db()
-    init_scheduler()
+    await start_http_session()
+
+    # Scheduled jobs normally run in the standalone worker (python -m worker)
+    if os.getenv('API_RUN_SCHEDULER', 'false').lower() == 'true':
+        app.state.scheduler = await start_scheduler("api")
 
 
 # Close database connection on shutdown
 @app.on_event("shutdown")
 async def shutdown_db_client():
     # MongoDB connections are closed automatically by Motor
-    pass
-
-
-# Initialize scheduler for periodic tasks
-def init_scheduler():
-    scheduler = BackgroundScheduler()
-
-    # Fetch Reddit items daily at midnight
-    scheduler.add_job(
-        fetch_reddit_items,
-        'cron',
-        hour=0,
-        minute=0
-    )
-
-    # Check prices for tracked items every 6 hours
-    scheduler.add_job(
-        check_prices_and_notify,
-        'interval',
-        hours=6
-    )
+    if getattr(app.state, "scheduler", None):
+        app.state.scheduler.shutdown(wait=False)
 
-    scheduler.start()
+    # Retailer fetch connections are pooled and must be closed explicitly
+    await close_http_session()
+    shutdown_parse_executor()
 
 
 # Health check endpoint
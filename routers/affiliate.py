@@ -71,13 +71,14 @@ async def affiliate_redirect(
     if not affiliate_url and chosen_link.affiliate_enabled:
         affiliate_url = generate_affiliate_link(chosen_link.url, chosen_link.name)
         if affiliate_url:
-            # Update the item with the new affiliate link
-            for i, link in enumerate(item.retailer_links):
-                if link.url == chosen_link.url:
-                    item.retailer_links[i].affiliate_url = affiliate_url
-                    item.retailer_links[i].affiliate_program = chosen_link.name.lower()
-                    await item.save()
-                    break
+            # Update only the matching retailer link so this doesn't race the price tracker
+            await Item.get_motor_collection().update_one(
+                {"_id": item.id, "retailer_links.url": chosen_link.url},
+                {"$set": {
+                    "retailer_links.$.affiliate_url": affiliate_url,
+                    "retailer_links.$.affiliate_program": chosen_link.name.lower()
+                }}
+            )
 
     # If no affiliate link available, use the regular link
     final_url = affiliate_url if affiliate_url else chosen_link.url
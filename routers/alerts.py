@@ -73,8 +73,10 @@ async def subscribe_to_item(
 
     # Add user to item's subscribers if not already there
     if auth0_user_id not in item.subscribers:
-        item.subscribers.append(auth0_user_id)
-        await item.save()
+        await Item.get_motor_collection().update_one(
+            {"_id": item.id},
+            {"$addToSet": {"subscribers": auth0_user_id}}
+        )
 
     # Add item to user's items if not already there
     if alert_data.item_id not in db_user.items:
@@ -111,8 +113,10 @@ async def unsubscribe_from_item(
     # Remove user from item's subscribers
     item = await Item.get(item_id)
     if item and auth0_user_id in item.subscribers:
-        item.subscribers.remove(auth0_user_id)
-        await item.save()
+        await Item.get_motor_collection().update_one(
+            {"_id": item.id},
+            {"$pull": {"subscribers": auth0_user_id}}
+        )
 
     # Remove item from user's items
     if item_id in db_user.items:
@@ -150,6 +150,18 @@ async def get_categories(
     return sorted(list(categories))
 
 
+@router.get("/by-product/{product_key}", response_model=List[ItemResponse])
+async def get_items_by_product(
+        product_key: str,
+        user: Auth0User = Depends(require_scope("read:items"))
+):
+    # Find every item with a retailer link for this product, e.g. "amazon:B00006JSUA"
+    items = await Item.find({"retailer_links.product_key": product_key}).to_list()
+
+    # Convert to response models
+    return [item_to_response(item) for item in items]
+
+
 @router.get("/user-items", response_model=List[ItemResponse])
 async def get_user_items(
         user: Auth0User = Depends(require_scope("read:items"))
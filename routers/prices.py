@@ -0,0 +1,137 @@
+# app/routers/prices.py - Routes for inspecting the price check subsystem
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi_auth0 import Auth0User
+from typing import Dict, Any, List
+
+from auth.auth_config import require_scope
+from utils.check_timings import get_timing_stats, get_recent_run_reports
+from utils.circuit_breaker import get_circuit_breaker_stats, get_recent_transitions
+from utils.price_runs import get_recent_runs, get_run_status
+from utils.http_client import get_http_session_stats
+from utils.rate_limiter import get_rate_limiter_stats
+from utils.page_cache import get_page_cache_stats
+from utils.price_tracker import get_extraction_stats, get_pipeline_stats, get_read_stats
+from utils.short_links import get_short_link_stats
+from utils.process_stats import get_process_usage, get_recent_process_usage
+from utils.jobs import get_job_stats
+from utils.job_lock import get_job_lock_stats
+
+router = APIRouter()
+
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_price_check_stats(
+        user: Auth0User = Depends(require_scope("read:admin"))
+):
+    """
+    Get runtime statistics for the price check subsystem.
+
+    Args:
+        user: Auth0 user with admin permissions
+
+    Returns:
+        Dict with statistics for each part of the price check path
+    """
+    return {
+        "http": get_http_session_stats(),
+        "retailers": get_rate_limiter_stats(),
+        "circuits": get_circuit_breaker_stats(),
+        "page_cache": get_page_cache_stats(),
+        "extraction_tiers": get_extraction_stats(),
+        "page_reads": get_read_stats(),
+        "pipeline": get_pipeline_stats(),
+        "short_links": get_short_link_stats(),
+        "process": get_process_usage("api"),
+        "jobs": get_job_stats(),
+        "job_locks": get_job_lock_stats(),
+        "workers": await get_recent_process_usage()
+    }
+
+
+@router.get("/timings", response_model=Dict[str, Any])
+async def get_price_check_timings(
+        runs: int = Query(5, ge=1, le=50),
+        user: Auth0User = Depends(require_scope("read:admin"))
+):
+    """
+    Get per-retailer stage timings (DNS, connect, download, parse, write,
+    email) and check outcomes.
+
+    Args:
+        runs: Number of recent run reports to include
+        user: Auth0 user with admin permissions
+
+    Returns:
+        Dict with this process's histograms per retailer and the latest run
+        reports written by every worker
+    """
+    return {
+        "retailers": get_timing_stats(),
+        "recent_runs": await get_recent_run_reports(runs)
+    }
+
+
+@router.get("/circuits", response_model=Dict[str, Any])
+async def get_circuit_breakers(
+        limit: int = Query(50, ge=1, le=500),
+        user: Auth0User = Depends(require_scope("read:admin"))
+):
+    """
+    Get the state of each retailer's circuit breaker and recent state transitions.
+
+    Args:
+        limit: Number of transitions to return
+        user: Auth0 user with admin permissions
+
+    Returns:
+        Dict with this process's breaker states and the latest transitions
+        recorded by every worker
+    """
+    return {
+        "retailers": get_circuit_breaker_stats()["retailers"],
+        "transitions": await get_recent_transitions(limit)
+    }
+
+
+@router.get("/runs", response_model=List[Dict[str, Any]])
+async def list_price_check_runs(
+        limit: int = Query(10, ge=1, le=50),
+        user: Auth0User = Depends(require_scope("read:admin"))
+):
+    """
+    Get recent full price check runs, running ones first.
+
+    Args:
+        limit: Number of runs to return
+        user: Auth0 user with admin permissions
+
+    Returns:
+        List of runs with status, progress percentage and ETA
+    """
+    return await get_recent_runs(limit)
+
+
+@router.get("/runs/{run_id}", response_model=Dict[str, Any])
+async def get_price_check_run(
+        run_id: str,
+        user: Auth0User = Depends(require_scope("read:admin"))
+):
+    """
+    Get the status, progress percentage and ETA of a price check run.
+
+    Args:
+        run_id: Run ID
+        user: Auth0 user with admin permissions
+
+    Returns:
+        The run's status and progress
+    """
+    run = await get_run_status(run_id)
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Run not found"
+        )
+
+    return run
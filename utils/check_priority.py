@@ -0,0 +1,91 @@
+# app/utils/check_priority.py - Adaptive next-check times for retailer links
+
+import math
+import os
+import statistics
+from datetime import datetime, timedelta
+from typing import List, Optional, Union
+from dotenv import load_dotenv
+
+from database.database import Item, ItemPriceCheck, PriceHistory, RetailerLink, VOLATILITY_WINDOW
+
+# Load environment variables
+load_dotenv()
+
+# Bounds and default for the time between two checks of a link, in hours
+PRICE_CHECK_BASE_HOURS = float(os.getenv('PRICE_CHECK_BASE_HOURS', '6'))
+PRICE_CHECK_MIN_HOURS = float(os.getenv('PRICE_CHECK_MIN_HOURS', '1'))
+PRICE_CHECK_MAX_HOURS = float(os.getenv('PRICE_CHECK_MAX_HOURS', '48'))
+
+# A drop within this many days makes an item "hot"
+RECENT_DROP_DAYS = int(os.getenv('RECENT_DROP_DAYS', '7'))
+
+
+def price_volatility(price_history: List[PriceHistory]) -> float:
+    """Coefficient of variation of the most recent prices (0 for a flat history)."""
+    prices = [entry.price for entry in price_history[-VOLATILITY_WINDOW:] if entry.price]
+    if len(prices) < 2:
+        return 0.0
+    return statistics.pstdev(prices) / statistics.mean(prices)
+
+
+def had_recent_drop(price_history: List[PriceHistory], now: datetime) -> bool:
+    """Check whether the price history recorded a lower price in the last RECENT_DROP_DAYS."""
+    cutoff = now - timedelta(days=RECENT_DROP_DAYS)
+    for previous, entry in zip(price_history, price_history[1:]):
+        if entry.date >= cutoff and entry.price < previous.price:
+            return True
+    return False
+
+
+def check_interval(item: Union[Item, ItemPriceCheck], now: Optional[datetime] = None) -> timedelta:
+    """
+    How long to wait before checking an item's links again.
+
+    Volatile prices, recent drops and subscribers all shorten the interval;
+    items nobody watches with a flat price history are checked least often.
+    """
+    now = now or datetime.now()
+    hours = PRICE_CHECK_BASE_HOURS
+
+    volatility = price_volatility(item.price_history)
+    subscribers = item.subscriber_count
+
+    # A 10% coefficient of variation halves the interval
+    hours /= 1 + volatility * 10
+
+    # Each doubling of subscribers shortens it further
+    hours /= 1 + math.log2(1 + subscribers)
+
+    if had_recent_drop(item.price_history, now):
+        hours /= 2
+
+    if subscribers == 0 and volatility == 0:
+        hours *= 4
+
+    hours = max(PRICE_CHECK_MIN_HOURS, min(PRICE_CHECK_MAX_HOURS, hours))
+    return timedelta(hours=hours)
+
+
+def next_check_at(item: Union[Item, ItemPriceCheck], now: Optional[datetime] = None) -> datetime:
+    """When an item's links that were just checked should be checked next."""
+    now = now or datetime.now()
+    return now + check_interval(item, now)
+
+
+def scheduled_check_at(item: Union[Item, ItemPriceCheck], link: RetailerLink) -> Optional[datetime]:
+    """
+    When a link is due. Links stored before scheduling existed are due one
+    interval after their last check, and links never checked are due now (None).
+    """
+    if link.next_check_at is not None:
+        return link.next_check_at
+    if link.last_checked is not None:
+        return link.last_checked + check_interval(item, link.last_checked)
+    return None
+
+
+def is_due(item: Union[Item, ItemPriceCheck], link: RetailerLink, now: datetime) -> bool:
+    """Check whether a link's next check time has passed."""
+    due_at = scheduled_check_at(item, link)
+    return due_at is None or due_at <= now
@@ -0,0 +1,179 @@
+# app/utils/check_timings.py - Per-stage timings and outcomes of retailer link checks
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+from database.database import db
+from utils.leases import WORKER_ID
+
+# Load environment variables
+load_dotenv()
+
+# Upper bounds (ms) of the histogram buckets; anything slower lands in +Inf
+HISTOGRAM_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Stages of a link check, in the order they happen. "connect" is the TCP
+# connect plus TLS handshake; aiohttp doesn't time the handshake on its own.
+STAGES = ['dns', 'connect', 'download', 'parse', 'write', 'email']
+
+# Structured report written at the end of every price check run
+run_report_collection = db.price_run_reports
+
+
+class Histogram:
+    """Counts of observed durations per bucket of HISTOGRAM_BOUNDS_MS."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if ms <= bound), len(HISTOGRAM_BOUNDS_MS))
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(HISTOGRAM_BOUNDS_MS[index]) if index < len(HISTOGRAM_BOUNDS_MS) else round(self.max, 1)
+        return round(self.max, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in HISTOGRAM_BOUNDS_MS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": round(self.max, 1),
+            "buckets": dict(zip(labels, self.buckets))
+        }
+
+
+class TimingStats:
+    """Stage histograms and outcome counts per retailer."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[str, Histogram]] = {}
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+
+    def observe(self, retailer: str, stage: str, seconds: float) -> None:
+        stages = self.histograms.setdefault(retailer, {})
+        stages.setdefault(stage, Histogram()).observe(seconds)
+
+    def count_outcome(self, retailer: str, outcome: str) -> None:
+        outcomes = self.outcomes.setdefault(retailer, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        retailers = sorted(set(self.histograms) | set(self.outcomes))
+        return {
+            retailer: {
+                "outcomes": dict(self.outcomes.get(retailer, {})),
+                "stages": {
+                    stage: self.histograms[retailer][stage].to_dict()
+                    for stage in STAGES if stage in self.histograms.get(retailer, {})
+                }
+            }
+            for retailer in retailers
+        }
+
+
+class LinkTiming:
+    """
+    Stage timings and the outcome of fetching and parsing one retailer link.
+
+    Passed to the HTTP session as trace_request_ctx so the DNS and connect
+    times of the request land here (see utils.http_client).
+
+    Outcomes: ok, no_price, not_modified, throttled, http_error, server_error,
+    blocked (bot challenge page), circuit_open (skipped), timeout,
+    connection_error (DNS, connection or transfer failure), internal_error
+    (an exception in our own code or database, not the retailer's fault)
+    """
+
+    def __init__(self, retailer: str):
+        self.retailer = retailer
+        self.stages: Dict[str, float] = {}
+        self.outcome = 'internal_error'
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+
+# Every check since this process started
+_process_stats = TimingStats()
+
+
+def record_link_timing(timing: LinkTiming, run: Optional[TimingStats] = None) -> None:
+    """Add a finished link check to the process-wide stats and, if given, a run's stats."""
+    for stats in (_process_stats, run):
+        if stats is None:
+            continue
+        for stage, seconds in timing.stages.items():
+            stats.observe(timing.retailer, stage, seconds)
+        stats.count_outcome(timing.retailer, timing.outcome)
+
+
+def record_stage(retailer: str, stage: str, seconds: float, run: Optional[TimingStats] = None) -> None:
+    """Add a stage timed outside a LinkTiming (Mongo writes, emails)."""
+    _process_stats.observe(retailer, stage, seconds)
+    if run is not None:
+        run.observe(retailer, stage, seconds)
+
+
+def get_timing_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get stage histograms and outcome counts per retailer since the process started.
+
+    Returns:
+        Dict keyed by retailer with outcome counts and, per stage, the count,
+        mean, approximate p50/p95, max and bucket counts (ms)
+    """
+    return _process_stats.to_dict()
+
+
+async def save_run_report(run: str, started_at: datetime, summary: Dict[str, Any], timings: TimingStats) -> None:
+    """Write the structured report of a finished price check run."""
+    try:
+        await run_report_collection.insert_one({
+            "run": run,
+            "worker": WORKER_ID,
+            "started_at": started_at,
+            "finished_at": datetime.now(),
+            "summary": summary,
+            "retailers": timings.to_dict()
+        })
+    except Exception as e:
+        print(f"Error saving {run} run report: {e}")
+
+
+async def get_recent_run_reports(limit: int = 10) -> List[Dict[str, Any]]:
+    """Get the latest price check run reports, newest first."""
+    reports = await run_report_collection.find(
+        {}, {"_id": 0}
+    ).sort("finished_at", -1).limit(limit).to_list(length=limit)
+    return reports
@@ -0,0 +1,191 @@
+# app/utils/circuit_breaker.py - Per-retailer circuit breakers with half-open probing
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List
+from dotenv import load_dotenv
+
+from database.database import db
+from utils.leases import WORKER_ID
+
+# Load environment variables
+load_dotenv()
+
+# Consecutive failed checks that open a retailer's circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+
+# How long a circuit stays open before a probe is let through; doubles after
+# every failed probe, up to the maximum
+CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '120'))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv('CIRCUIT_MAX_OPEN_SECONDS', '1800'))
+
+# Checks let through at once while a circuit is half-open
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', '1'))
+
+# Link check outcomes (utils.check_timings.LinkTiming) that count against a
+# retailer, and ones that show it is answering. Other outcomes are ignored,
+# including internal_error: a bug or database error on our side says nothing
+# about the retailer.
+FAILURE_OUTCOMES = {'throttled', 'timeout', 'connection_error', 'server_error', 'blocked'}
+SUCCESS_OUTCOMES = {'ok', 'not_modified', 'no_price', 'http_error'}
+
+# State transitions of every process's breakers, kept for post-mortems
+breaker_event_collection = db.circuit_breaker_events
+
+# Latest transitions in this process
+_transitions: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+
+class CircuitBreaker:
+    """
+    Closed: checks run and consecutive failures are counted. Open: checks
+    are skipped until the open period ends. Half-open: a few probe checks
+    run. A successful probe closes the circuit; a failed one reopens it for
+    twice as long.
+    """
+
+    def __init__(self, retailer: str):
+        self.retailer = retailer
+        self.state = 'closed'
+        self.failures = 0
+        self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.opened_at = 0.0
+        self.probes = 0
+        self.skipped = 0
+        self.times_opened = 0
+
+    def is_open(self) -> bool:
+        """Whether checks are being skipped; a half-open circuit isn't open."""
+        return self.state == 'open' and time.monotonic() < self.opened_at + self.open_seconds
+
+    def retry_at(self) -> datetime:
+        """
+        When to retry a check the circuit refused. While probes are in flight
+        it isn't known when the circuit will close, so that's a full open
+        period away; retrying sooner would only be refused again.
+        """
+        if self.state == 'open':
+            remaining = max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+        elif self.state == 'half_open':
+            remaining = self.open_seconds
+        else:
+            remaining = 0.0
+        return datetime.now() + timedelta(seconds=remaining)
+
+    def allow(self) -> bool:
+        """
+        Take permission for one check. Counts the check as skipped if refused.
+
+        A check let through while half-open is a probe, and whoever runs it
+        must call end_probe() once it is over, however it ended.
+        """
+        if self.state == 'open' and not self.is_open():
+            self._transition('half_open', 'open period elapsed')
+
+        if self.state == 'closed':
+            return True
+
+        if self.state == 'half_open' and self.probes < CIRCUIT_HALF_OPEN_PROBES:
+            self.probes += 1
+            return True
+
+        self.skipped += 1
+        return False
+
+    def end_probe(self) -> None:
+        """Free the slot of a probe let through by allow()."""
+        self.probes = max(0, self.probes - 1)
+
+    def skip(self) -> None:
+        """Count a check skipped without asking allow(), e.g. one never queued."""
+        self.skipped += 1
+
+    def record_outcome(self, outcome: str) -> None:
+        if outcome in SUCCESS_OUTCOMES:
+            self.failures = 0
+            if self.state == 'half_open':
+                self.open_seconds = CIRCUIT_OPEN_SECONDS
+                self._transition('closed', f'probe succeeded ({outcome})')
+
+        elif outcome in FAILURE_OUTCOMES:
+            self.failures += 1
+            if self.state == 'half_open':
+                self.open_seconds = min(self.open_seconds * 2, CIRCUIT_MAX_OPEN_SECONDS)
+                self._open(f'probe failed ({outcome})')
+            elif self.state == 'closed' and self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+                self._open(f'{self.failures} consecutive failures, last {outcome}')
+
+    def _open(self, reason: str) -> None:
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._transition('open', reason)
+
+    def _transition(self, state: str, reason: str) -> None:
+        event = {
+            "retailer": self.retailer,
+            "from_state": self.state,
+            "to_state": state,
+            "reason": reason,
+            "open_seconds": self.open_seconds if state == 'open' else None,
+            "worker": WORKER_ID,
+            "timestamp": datetime.now()
+        }
+        self.state = state
+        _transitions.append(event)
+        print(f"Circuit for {self.retailer} {event['from_state']} -> {state}: {reason}")
+
+        try:
+            asyncio.get_running_loop().create_task(_save_transition(dict(event)))
+        except RuntimeError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": 'half_open' if self.state == 'open' and not self.is_open() else self.state,
+            "consecutive_failures": self.failures,
+            "open_seconds": self.open_seconds,
+            "retry_at": self.retry_at() if self.state == 'open' else None,
+            "probes_in_flight": self.probes,
+            "skipped": self.skipped,
+            "times_opened": self.times_opened
+        }
+
+
+async def _save_transition(event: Dict[str, Any]) -> None:
+    try:
+        await breaker_event_collection.insert_one(event)
+    except Exception as e:
+        print(f"Error saving circuit transition for {event['retailer']}: {e}")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(retailer: str) -> CircuitBreaker:
+    """Get the circuit breaker for a retailer, creating one for unknown retailers."""
+    if retailer not in _breakers:
+        _breakers[retailer] = CircuitBreaker(retailer)
+    return _breakers[retailer]
+
+
+def get_circuit_breaker_stats() -> Dict[str, Any]:
+    """
+    Get the state of every retailer's circuit and this process's latest transitions.
+
+    Returns:
+        Dict with per-retailer breaker statistics and recent transitions, newest first
+    """
+    return {
+        "retailers": {name: breaker.stats() for name, breaker in _breakers.items()},
+        "transitions": list(reversed(_transitions))
+    }
+
+
+async def get_recent_transitions(limit: int = 50) -> List[Dict[str, Any]]:
+    """Get the latest circuit transitions recorded by every process, newest first."""
+    return await breaker_event_collection.find(
+        {}, {"_id": 0}
+    ).sort("timestamp", -1).limit(limit).to_list(length=limit)
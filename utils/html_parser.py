@@ -0,0 +1,82 @@
+# app/utils/html_parser.py - Pluggable HTML parser backends for price extraction
+
+import os
+from typing import Any, List, Optional
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Parser backend used by the extractors: html.parser, lxml or selectolax
+PRICE_HTML_PARSER = os.getenv('PRICE_HTML_PARSER', 'lxml')
+
+PARSER_BACKENDS = ['html.parser', 'lxml', 'selectolax']
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    HTMLParser = None
+    SELECTOLAX_AVAILABLE = False
+
+
+class SelectolaxNode:
+    """
+    Wraps a selectolax node with the small part of the BeautifulSoup API the
+    extractors use: select_one, select, text and get.
+    """
+
+    def __init__(self, node):
+        self._node = node
+
+    def select_one(self, selector: str) -> Optional['SelectolaxNode']:
+        node = self._node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def select(self, selector: str) -> List['SelectolaxNode']:
+        return [SelectolaxNode(node) for node in self._node.css(selector)]
+
+    @property
+    def text(self) -> str:
+        return self._node.text(deep=True, separator='', strip=False)
+
+    def get(self, attribute: str, default: Any = None) -> Any:
+        return self._node.attributes.get(attribute, default)
+
+
+def available_backends() -> List[str]:
+    """Get the parser backends that can be used in this environment."""
+    backends = ['html.parser']
+    if LXML_AVAILABLE:
+        backends.append('lxml')
+    if SELECTOLAX_AVAILABLE:
+        backends.append('selectolax')
+    return backends
+
+
+def parse_html(html: str, backend: Optional[str] = None):
+    """
+    Parse a page with the configured backend.
+
+    Falls back to the built-in html.parser when the requested backend isn't
+    installed, so a missing optional dependency never stops price checks.
+
+    Returns:
+        BeautifulSoup, or a SelectolaxNode exposing the same selector API
+    """
+    backend = backend or PRICE_HTML_PARSER
+
+    if backend == 'selectolax' and SELECTOLAX_AVAILABLE:
+        return SelectolaxNode(HTMLParser(html).root)
+
+    if backend == 'lxml' and LXML_AVAILABLE:
+        return BeautifulSoup(html, 'lxml')
+
+    return BeautifulSoup(html, 'html.parser')
@@ -0,0 +1,153 @@
+# app/utils/http_client.py - Shared, pooled aiohttp session for retailer fetches
+
+import os
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+import aiohttp
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool configuration
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', '8'))
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))
+
+# The session shared by every price check in this process
+_session: Optional[aiohttp.ClientSession] = None
+
+# Connection statistics collected through aiohttp tracing
+_stats = {
+    "requests": 0,
+    "connections_created": 0,
+    "connections_reused": 0,
+    "tls_handshakes": 0,
+    "dns_cache_hits": 0,
+    "dns_cache_misses": 0
+}
+
+
+async def _on_request_start(session, ctx: SimpleNamespace, params) -> None:
+    _stats["requests"] += 1
+    ctx.is_tls = params.url.scheme == 'https'
+
+
+def _record_stage(ctx: SimpleNamespace, stage: str, seconds: float) -> None:
+    """Pass a stage time to the request's timing, if the caller gave one as trace_request_ctx."""
+    add = getattr(ctx.trace_request_ctx, 'add', None)
+    if add is not None:
+        add(stage, seconds)
+
+
+async def _on_connection_create_start(session, ctx: SimpleNamespace, params) -> None:
+    ctx.connect_started = time.perf_counter()
+    ctx.dns_seconds = 0.0
+
+
+async def _on_connection_create_end(session, ctx: SimpleNamespace, params) -> None:
+    _stats["connections_created"] += 1
+    if getattr(ctx, 'is_tls', False):
+        _stats["tls_handshakes"] += 1
+
+    # Connection creation includes the DNS lookup, which is timed separately
+    if hasattr(ctx, 'connect_started'):
+        _record_stage(ctx, 'connect', time.perf_counter() - ctx.connect_started - ctx.dns_seconds)
+
+
+async def _on_dns_resolvehost_start(session, ctx: SimpleNamespace, params) -> None:
+    ctx.dns_started = time.perf_counter()
+
+
+async def _on_dns_resolvehost_end(session, ctx: SimpleNamespace, params) -> None:
+    if hasattr(ctx, 'dns_started'):
+        seconds = time.perf_counter() - ctx.dns_started
+        ctx.dns_seconds = getattr(ctx, 'dns_seconds', 0.0) + seconds
+        _record_stage(ctx, 'dns', seconds)
+
+
+async def _on_connection_reuseconn(session, ctx: SimpleNamespace, params) -> None:
+    _stats["connections_reused"] += 1
+
+
+async def _on_dns_cache_hit(session, ctx: SimpleNamespace, params) -> None:
+    _stats["dns_cache_hits"] += 1
+
+
+async def _on_dns_cache_miss(session, ctx: SimpleNamespace, params) -> None:
+    _stats["dns_cache_misses"] += 1
+
+
+def _create_session() -> aiohttp.ClientSession:
+    """
+    Create a session with a bounded keep-alive pool and a DNS cache.
+
+    Requests made with a trace_request_ctx that has an add(stage, seconds)
+    method (utils.check_timings.LinkTiming) get their DNS and connect times.
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_dns_resolvehost_start.append(_on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(_on_dns_resolvehost_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace_config.on_dns_cache_hit.append(_on_dns_cache_hit)
+    trace_config.on_dns_cache_miss.append(_on_dns_cache_miss)
+
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+    )
+
+    return aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+
+
+async def start_http_session() -> None:
+    """Open the shared session. Called from the app's startup event."""
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Get the shared session, creating it on first use.
+
+    Must be called from inside a running event loop.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
+
+
+async def close_http_session() -> None:
+    """Close the shared session and its pooled connections. Called on shutdown."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def get_http_session_stats() -> Dict[str, Any]:
+    """
+    Get connection pool statistics for the shared session.
+
+    Returns:
+        Dict with request, connection, TLS handshake and DNS cache counts,
+        plus the share of requests that reused a pooled connection
+    """
+    connections = _stats["connections_created"] + _stats["connections_reused"]
+    return {
+        **_stats,
+        "reuse_rate": (_stats["connections_reused"] / connections) * 100 if connections > 0 else 0,
+        "pool_limit": HTTP_POOL_LIMIT,
+        "pool_limit_per_host": HTTP_POOL_LIMIT_PER_HOST,
+        "session_open": _session is not None and not _session.closed
+    }
@@ -0,0 +1,214 @@
+# app/utils/job_lock.py - Mongo-backed job locks with TTL and fencing tokens
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database.database import db
+from utils.leases import WORKER_ID
+
+# Load environment variables
+load_dotenv()
+
+# A held lock expires this long after its last renewal
+JOB_LOCK_TTL_SECONDS = int(os.getenv('JOB_LOCK_TTL_SECONDS', '300'))
+
+# One document per lock name
+lock_collection = db.job_locks
+
+# Takeovers of expired locks, kept for post-mortems
+lock_event_collection = db.job_lock_events
+
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+class LockLostError(RuntimeError):
+    """Raised out of a job_lock block whose lock was taken over while it ran."""
+
+
+class JobLock:
+    """
+    A held lock. The fencing token grows with every acquisition of the lock,
+    so writes that carry it can be refused once someone else holds the lock.
+    """
+
+    def __init__(self, name: str, token: int):
+        self.name = name
+        self.token = token
+        self.lost = False
+
+    async def renew(self) -> bool:
+        """Push back the expiry. Returns False if the lock was lost to another owner."""
+        result = await lock_collection.update_one(
+            {"_id": self.name, "owner": WORKER_ID, "fencing_token": self.token},
+            {"$set": {"expires_at": datetime.now() + timedelta(seconds=JOB_LOCK_TTL_SECONDS)}}
+        )
+        return result.matched_count > 0
+
+
+def _lock_stats(name: str) -> Dict[str, Any]:
+    return _stats.setdefault(name, {
+        "attempts": 0,
+        "acquired": 0,
+        "contended": 0,
+        "takeovers": 0,
+        "lost": 0,
+        "last_acquire_ms": None,
+        "max_acquire_ms": 0.0,
+        "total_acquire_ms": 0.0
+    })
+
+
+async def acquire_job_lock(name: str) -> Optional[JobLock]:
+    """
+    Try to take a lock without waiting.
+
+    The lock is free if it was released or its holder stopped renewing it.
+    Taking over an expired lock that was never released is recorded in
+    job_lock_events.
+
+    Returns:
+        JobLock if acquired, None if another process holds it
+    """
+    stats = _lock_stats(name)
+    stats["attempts"] += 1
+    started = time.perf_counter()
+    now = datetime.now()
+
+    try:
+        previous = await lock_collection.find_one_and_update(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": None}]},
+            {
+                "$set": {
+                    "owner": WORKER_ID,
+                    "acquired_at": now,
+                    "expires_at": now + timedelta(seconds=JOB_LOCK_TTL_SECONDS)
+                },
+                "$inc": {"fencing_token": 1}
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # The upsert tried to insert because the lock is held and unexpired
+        previous = False
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    stats["last_acquire_ms"] = round(elapsed_ms, 2)
+    stats["max_acquire_ms"] = max(stats["max_acquire_ms"], round(elapsed_ms, 2))
+    stats["total_acquire_ms"] += elapsed_ms
+
+    if previous is False:
+        stats["contended"] += 1
+        return None
+
+    stats["acquired"] += 1
+    token = (previous or {}).get("fencing_token", 0) + 1
+
+    if previous and previous.get("owner"):
+        stats["takeovers"] += 1
+        await lock_event_collection.insert_one({
+            "lock": name,
+            "event": "takeover",
+            "previous_owner": previous["owner"],
+            "previous_token": previous.get("fencing_token"),
+            "previous_expired_at": previous.get("expires_at"),
+            "new_owner": WORKER_ID,
+            "new_token": token,
+            "timestamp": now
+        })
+        print(f"Took over expired lock {name} from {previous['owner']}")
+
+    return JobLock(name, token)
+
+
+async def release_job_lock(lock: JobLock) -> None:
+    """Release a lock if it's still ours."""
+    await lock_collection.update_one(
+        {"_id": lock.name, "owner": WORKER_ID, "fencing_token": lock.token},
+        {"$set": {"owner": None, "expires_at": datetime.now()}}
+    )
+
+
+async def _keep_alive(lock: JobLock, holder: asyncio.Task) -> None:
+    """
+    Renew the lock every third of its TTL. If it was taken over, or renewals
+    kept failing until it could have expired, cancel the task holding it so
+    two processes never run the job at once.
+    """
+    expires = time.monotonic() + JOB_LOCK_TTL_SECONDS
+    while True:
+        await asyncio.sleep(JOB_LOCK_TTL_SECONDS / 3)
+        attempted = time.monotonic()
+        try:
+            renewed = await lock.renew()
+        except Exception as e:
+            print(f"Error renewing lock {lock.name}: {e}")
+            renewed = False
+            if time.monotonic() < expires:
+                continue
+
+        if renewed:
+            expires = attempted + JOB_LOCK_TTL_SECONDS
+            continue
+
+        lock.lost = True
+        _lock_stats(lock.name)["lost"] += 1
+        print(f"Lost lock {lock.name} (token {lock.token}), stopping the job")
+        holder.cancel()
+        return
+
+
+@asynccontextmanager
+async def job_lock(name: str):
+    """
+    Hold a lock for the duration of a block, renewing it in the background.
+
+    If the lock is lost while the block runs, the block is cancelled and
+    LockLostError is raised in its place.
+
+    Yields:
+        JobLock, or None if another process holds the lock
+    """
+    lock = await acquire_job_lock(name)
+    if lock is None:
+        yield None
+        return
+
+    holder = asyncio.current_task()
+    keep_alive = asyncio.create_task(_keep_alive(lock, holder))
+    try:
+        yield lock
+    except asyncio.CancelledError:
+        if not lock.lost:
+            raise
+        # The cancellation came from _keep_alive, not from whoever awaits us
+        if hasattr(holder, 'uncancel'):
+            holder.uncancel()
+        raise LockLostError(f"Lost lock {name} (token {lock.token}) while the job was running")
+    finally:
+        keep_alive.cancel()
+        await release_job_lock(lock)
+
+
+def get_job_lock_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get acquisition metrics for every lock this process has tried to take.
+
+    Returns:
+        Dict keyed by lock name with attempt, acquisition, contention,
+        takeover and lost counts and acquisition latency in milliseconds
+    """
+    return {
+        name: {
+            **{key: value for key, value in stats.items() if key != "total_acquire_ms"},
+            "average_acquire_ms": round(stats["total_acquire_ms"] / stats["attempts"], 2) if stats["attempts"] else None
+        }
+        for name, stats in _stats.items()
+    }
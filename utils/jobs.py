@@ -0,0 +1,200 @@
+# app/utils/jobs.py - Scheduled jobs on the asyncio event loop, with run metrics
+
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MAX_INSTANCES
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from dotenv import load_dotenv
+
+from database.database import db
+from utils.leases import WORKER_ID
+
+# Load environment variables
+load_dotenv()
+
+PRICE_QUEUE_POLL_MINUTES = int(os.getenv('PRICE_QUEUE_POLL_MINUTES', '5'))
+
+# Hours between full price check cycles, which catch links the due-link
+# queue has missed (0 turns them off)
+PRICE_FULL_CYCLE_HOURS = float(os.getenv('PRICE_FULL_CYCLE_HOURS', '24'))
+
+# Last run of every job, so a restarted process keeps the same rhythm
+job_run_collection = db.job_runs
+
+# Scheduled fire time of each job's pending run, from the submission event
+_scheduled_times: Dict[str, datetime] = {}
+
+# Run metrics per job
+_job_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def _on_job_submitted(event) -> None:
+    if event.scheduled_run_times:
+        _scheduled_times[event.job_id] = event.scheduled_run_times[-1]
+
+
+def _on_job_max_instances(event) -> None:
+    # The previous run is still going; APScheduler drops this one
+    if event.job_id in _job_stats:
+        _job_stats[event.job_id]["skipped"] += 1
+
+
+def tracked_job(name: str, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[None]]:
+    """
+    Wrap a job coroutine to record start lag and duration, persist the last
+    run and skip a start while the previous run is still going.
+    """
+    stats = _job_stats.setdefault(name, {
+        "runs": 0,
+        "skipped": 0,
+        "failures": 0,
+        "running": False,
+        "last_lag_seconds": None,
+        "max_lag_seconds": 0.0,
+        "last_duration_seconds": None,
+        "total_duration_seconds": 0.0,
+        "last_started_at": None
+    })
+
+    async def run(*args) -> None:
+        if stats["running"]:
+            stats["skipped"] += 1
+            return
+
+        scheduled = _scheduled_times.pop(name, None)
+        started_at = datetime.now(scheduled.tzinfo) if scheduled else datetime.now()
+        lag = max(0.0, (started_at - scheduled).total_seconds()) if scheduled else 0.0
+
+        stats["running"] = True
+        stats["last_started_at"] = started_at
+        stats["last_lag_seconds"] = round(lag, 3)
+        stats["max_lag_seconds"] = max(stats["max_lag_seconds"], round(lag, 3))
+        started = time.perf_counter()
+        status = "ok"
+        error = None
+
+        try:
+            await func(*args)
+        except Exception as e:
+            status = "failed"
+            error = str(e)
+            stats["failures"] += 1
+            print(f"Job {name} failed: {e}")
+        finally:
+            duration = time.perf_counter() - started
+            stats["running"] = False
+            stats["runs"] += 1
+            stats["last_duration_seconds"] = round(duration, 3)
+            stats["total_duration_seconds"] += duration
+
+        await job_run_collection.update_one(
+            {"_id": name},
+            {"$set": {
+                "last_started_at": started_at.replace(tzinfo=None),
+                "last_finished_at": datetime.now(),
+                "last_duration_seconds": round(duration, 3),
+                "last_lag_seconds": round(lag, 3),
+                "last_status": status,
+                "last_error": error,
+                "worker_id": WORKER_ID
+            }},
+            upsert=True
+        )
+
+    return run
+
+
+async def first_interval_run(name: str, interval: timedelta) -> datetime:
+    """First run of an interval job: one interval after its persisted last start, or now."""
+    last_run = await job_run_collection.find_one({"_id": name})
+    now = datetime.now()
+    if not last_run or not last_run.get("last_started_at"):
+        return now
+    return max(now, last_run["last_started_at"] + interval)
+
+
+async def start_scheduler(role: str) -> AsyncIOScheduler:
+    """
+    Start the scheduled jobs on the running event loop.
+
+    Overlapping runs are skipped and missed runs coalesced into one.
+
+    Args:
+        role: "api" or "worker", used in resource usage reports
+    """
+    from utils.price_runs import has_interrupted_run
+    from utils.price_tracker import check_due_prices, check_prices_and_notify
+    from utils.process_stats import publish_process_usage
+    from utils.reddit import fetch_reddit_items
+
+    scheduler = AsyncIOScheduler(job_defaults={
+        "coalesce": True,
+        "max_instances": 1,
+        "misfire_grace_time": 300
+    })
+    scheduler.add_listener(_on_job_submitted, EVENT_JOB_SUBMITTED)
+    scheduler.add_listener(_on_job_max_instances, EVENT_JOB_MAX_INSTANCES)
+
+    # Fetch Reddit items daily at midnight
+    scheduler.add_job(
+        tracked_job("reddit_ingestion", fetch_reddit_items),
+        CronTrigger(hour=0, minute=0),
+        id="reddit_ingestion"
+    )
+
+    # Check retailer links whose adaptive next-check time has passed
+    poll_interval = timedelta(minutes=PRICE_QUEUE_POLL_MINUTES)
+    scheduler.add_job(
+        tracked_job("price_checks", check_due_prices),
+        IntervalTrigger(minutes=PRICE_QUEUE_POLL_MINUTES),
+        id="price_checks",
+        next_run_time=await first_interval_run("price_checks", poll_interval)
+    )
+
+    # Check every link now and then, whatever its next-check time. A cycle
+    # cut short by a restart is resumed straight away from its checkpoint.
+    if PRICE_FULL_CYCLE_HOURS > 0:
+        cycle_interval = timedelta(hours=PRICE_FULL_CYCLE_HOURS)
+        if await has_interrupted_run("price_cycle"):
+            cycle_start = datetime.now()
+        else:
+            cycle_start = await first_interval_run("price_cycle", cycle_interval)
+        scheduler.add_job(
+            tracked_job("price_cycle", check_prices_and_notify),
+            IntervalTrigger(hours=PRICE_FULL_CYCLE_HOURS),
+            id="price_cycle",
+            next_run_time=cycle_start
+        )
+
+    # Report this process's resource usage
+    scheduler.add_job(
+        tracked_job("process_usage", publish_process_usage),
+        IntervalTrigger(minutes=1),
+        id="process_usage",
+        args=[role],
+        next_run_time=datetime.now()
+    )
+
+    scheduler.start()
+    return scheduler
+
+
+def get_job_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get run metrics for every job in this process.
+
+    Returns:
+        Dict keyed by job name with run, skip and failure counts, the last and
+        worst scheduled-vs-actual start lag, and last and average duration
+    """
+    return {
+        name: {
+            **{key: value for key, value in stats.items() if key != "total_duration_seconds"},
+            "average_duration_seconds": round(stats["total_duration_seconds"] / stats["runs"], 3) if stats["runs"] else None
+        }
+        for name, stats in _job_stats.items()
+    }
@@ -0,0 +1,134 @@
+# app/utils/leases.py - Lease-based claiming of due items across worker processes
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+from dotenv import load_dotenv
+from pymongo import ReturnDocument, UpdateOne
+
+from database.database import Item, ItemPriceCheck
+
+# Load environment variables
+load_dotenv()
+
+# How long a claimed item belongs to a worker before others may reclaim it
+PRICE_LEASE_SECONDS = int(os.getenv('PRICE_LEASE_SECONDS', '900'))
+
+# Unique per process, so leases from a restarted process are never mistaken for ours
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def due_filter(now: datetime) -> dict:
+    """Items with at least one link whose next check time has passed."""
+    return {"retailer_links": {"$elemMatch": {"$or": [
+        {"next_check_at": None},
+        {"next_check_at": {"$lte": now}}
+    ]}}}
+
+
+async def claim_due_items(limit: int) -> List[ItemPriceCheck]:
+    """
+    Lease up to `limit` due items for this worker, most overdue first.
+
+    Each item is claimed with an atomic find-and-modify, so two workers can
+    never hold the same item. Leases of crashed workers simply expire and the
+    items become claimable again.
+
+    Returns:
+        List of claimed items
+    """
+    collection = Item.get_motor_collection()
+    now = datetime.now()
+    claimed = []
+
+    for _ in range(limit):
+        document = await collection.find_one_and_update(
+            {
+                **due_filter(now),
+                "$or": [
+                    {"lease_expires_at": None},
+                    {"lease_expires_at": {"$lt": now}}
+                ]
+            },
+            {"$set": {
+                "lease_owner": WORKER_ID,
+                "lease_expires_at": now + timedelta(seconds=PRICE_LEASE_SECONDS)
+            }},
+            sort=[("retailer_links.next_check_at", 1)],
+            projection=ItemPriceCheck.Settings.projection,
+            return_document=ReturnDocument.AFTER
+        )
+        if document is None:
+            break
+
+        claimed.append(ItemPriceCheck.parse_obj(document))
+
+    return claimed
+
+
+async def claim_items(items: List[ItemPriceCheck], owner: str) -> List[ItemPriceCheck]:
+    """
+    Lease items that were read without claiming them, such as a batch of a
+    full cycle's scan, unless someone else holds an unexpired lease.
+
+    The whole batch takes two round trips: one claims every free item, one
+    reads back which of them the owner now holds.
+
+    Returns:
+        The items now leased to the owner
+    """
+    if not items:
+        return []
+
+    collection = Item.get_motor_collection()
+    now = datetime.now()
+    ids = [item.id for item in items]
+
+    await collection.update_many(
+        {
+            "_id": {"$in": ids},
+            "$or": [
+                {"lease_expires_at": None},
+                {"lease_expires_at": {"$lt": now}}
+            ]
+        },
+        {"$set": {
+            "lease_owner": owner,
+            "lease_expires_at": now + timedelta(seconds=PRICE_LEASE_SECONDS)
+        }}
+    )
+    held = set(await collection.distinct("_id", {"_id": {"$in": ids}, "lease_owner": owner}))
+
+    return [item for item in items if item.id in held]
+
+
+async def renew_leases(items: List[ItemPriceCheck], owner: str = WORKER_ID) -> None:
+    """Extend the owner's leases on items it is still checking."""
+    if not items:
+        return
+
+    await Item.get_motor_collection().update_many(
+        {"_id": {"$in": [item.id for item in items]}, "lease_owner": owner},
+        {"$set": {"lease_expires_at": datetime.now() + timedelta(seconds=PRICE_LEASE_SECONDS)}}
+    )
+
+
+def lease_release(item: ItemPriceCheck, owner: str = WORKER_ID) -> UpdateOne:
+    """An update giving up the owner's lease on an item, to batch with the item's own writes."""
+    return UpdateOne(
+        {"_id": item.id, "lease_owner": owner},
+        {"$set": {"lease_owner": None, "lease_expires_at": None}}
+    )
+
+
+async def release_items(items: List[ItemPriceCheck], owner: str = WORKER_ID) -> None:
+    """Give up the owner's leases on the given items."""
+    if not items:
+        return
+
+    await Item.get_motor_collection().update_many(
+        {"_id": {"$in": [item.id for item in items]}, "lease_owner": owner},
+        {"$set": {"lease_owner": None, "lease_expires_at": None}}
+    )
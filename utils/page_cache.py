@@ -0,0 +1,77 @@
+# app/utils/page_cache.py - Conditional GET validator cache for retailer pages
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from database.database import db
+
+# Collection of ETag / Last-Modified validators, keyed by retailer URL
+validator_collection = db.page_validators
+
+# Per-retailer counts of conditional requests and 304 responses
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+async def get_validators(url: str) -> Optional[Dict[str, Any]]:
+    """Get the stored validators and last extracted price for a URL, if any."""
+    return await validator_collection.find_one({"_id": url})
+
+
+def conditional_headers(cached: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from a cached entry."""
+    headers = {}
+    if not cached or cached.get("price") is None:
+        return headers
+
+    if cached.get("etag"):
+        headers['If-None-Match'] = cached["etag"]
+    if cached.get("last_modified"):
+        headers['If-Modified-Since'] = cached["last_modified"]
+
+    return headers
+
+
+async def store_validators(url: str, retailer: str, etag: Optional[str],
+                           last_modified: Optional[str], price: float) -> None:
+    """Remember a page's validators together with the price extracted from it."""
+    if not etag and not last_modified:
+        return
+
+    await validator_collection.update_one(
+        {"_id": url},
+        {"$set": {
+            "retailer": retailer,
+            "etag": etag,
+            "last_modified": last_modified,
+            "price": price,
+            "updated_at": datetime.now()
+        }},
+        upsert=True
+    )
+
+
+def record_lookup(retailer: str, conditional: bool, not_modified: bool) -> None:
+    """Count a fetch for a retailer and whether it was answered with a 304."""
+    stats = _stats.setdefault(retailer, {"requests": 0, "conditional": 0, "not_modified": 0})
+    stats["requests"] += 1
+    if conditional:
+        stats["conditional"] += 1
+    if not_modified:
+        stats["not_modified"] += 1
+
+
+def get_page_cache_stats() -> Dict[str, Any]:
+    """
+    Get the conditional GET hit rate for each retailer.
+
+    Returns:
+        Dict keyed by retailer name with request, conditional request and
+        304 counts, and the share of all requests served from the cache
+    """
+    return {
+        retailer: {
+            **stats,
+            "hit_rate": (stats["not_modified"] / stats["requests"]) * 100 if stats["requests"] > 0 else 0
+        }
+        for retailer, stats in _stats.items()
+    }
@@ -0,0 +1,60 @@
+# app/utils/parse_pool.py - Process pool for parsing product pages off the event loop
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Number of parser processes; 0 parses inline on the event loop
+PRICE_PARSE_WORKERS = int(os.getenv('PRICE_PARSE_WORKERS', '2'))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def parse_page(body: bytes, encoding: str, retailer: str) -> Tuple[Optional[float], str]:
+    """
+    Decode and extract the price from a raw page. Runs in a worker process,
+    so only the bytes go in and only the price and tier come back.
+    """
+    from utils.price_tracker import extract_price_and_tier
+
+    html = body.decode(encoding, errors='replace')
+    return extract_price_and_tier(html, retailer)
+
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Get the shared parser pool, starting it on first use. None when parsing inline."""
+    global _executor
+    if PRICE_PARSE_WORKERS <= 0:
+        return None
+
+    if _executor is None:
+        # Spawn rather than fork: the parent has a running event loop and Motor threads
+        _executor = ProcessPoolExecutor(
+            max_workers=PRICE_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+
+async def parse_page_off_loop(body: bytes, encoding: str, retailer: str) -> Tuple[Optional[float], str]:
+    """Parse a page in the process pool, or inline if the pool is disabled."""
+    executor = get_parse_executor()
+    if executor is None:
+        return parse_page(body, encoding, retailer)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, parse_page, body, encoding, retailer)
+
+
+def shutdown_parse_executor() -> None:
+    """Stop the parser processes. Called on shutdown."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,160 @@
+# app/utils/pipeline.py - Staged worker pipeline with bounded queues
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class Stage:
+    """
+    One pipeline stage: a bounded queue drained by a fixed number of workers.
+
+    A handler passes work on by awaiting the next stage's put(), so when a
+    downstream queue is full the upstream workers wait and the backpressure
+    reaches whatever feeds the first stage.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[None]], workers: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.peak_depth = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def put(self, job: Any) -> None:
+        """Queue a job, waiting while the stage is full."""
+        await self.queue.put(job)
+        self.peak_depth = max(self.peak_depth, self.queue.qsize())
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.finished = time.perf_counter()
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                await self.handler(job)
+            except Exception as e:
+                self.failed += 1
+                print(f"Error in {self.name} stage: {e}")
+            finally:
+                self.busy_seconds += time.perf_counter() - started
+                self.processed += 1
+                self.queue.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the stage's queue depth and throughput.
+
+        Returns:
+            Dict with worker count, current and peak queue depth, jobs
+            processed and failed, jobs per second, and the share of worker
+            time spent busy (near 1.0 means the stage needs more workers)
+        """
+        if self.started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "peak_depth": self.peak_depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "per_second": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed > 0 else 0.0
+        }
+
+
+class Lanes:
+    """
+    A per-key concurrency limit inside a stage's handler that never parks a
+    worker behind a busy key.
+
+    A job whose key already has `limit` jobs running is queued on that key's
+    lane and the worker moves on to its next job. The workers running that
+    key's jobs take the lane's jobs one by one before returning, so at most
+    `limit` of the stage's workers are ever held by one key. A lane holds
+    at most `lane_size` jobs; past that the worker waits for room, so a key
+    that falls far behind holds back whatever feeds the stage rather than
+    growing memory.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], limit: int, lane_size: int):
+        self.handler = handler
+        self.limit = limit
+        self.lane_size = lane_size
+        self.running: Dict[str, int] = {}
+        self.lanes: Dict[str, asyncio.Queue] = {}
+
+    async def run(self, key: str, job: Any) -> None:
+        """Run a job now if its key has a free slot, or queue it on the key's lane."""
+        if key not in self.lanes:
+            self.lanes[key] = asyncio.Queue(maxsize=self.lane_size)
+            self.running[key] = 0
+        lane = self.lanes[key]
+
+        if self.running[key] >= self.limit:
+            await lane.put(job)
+            # The key's running jobs drain the lane, unless they all finished while this one waited
+            if self.running[key] >= self.limit or lane.empty():
+                return
+            job = lane.get_nowait()
+
+        self.running[key] += 1
+        try:
+            while True:
+                try:
+                    await self.handler(job)
+                except Exception as e:
+                    print(f"Error in {key} lane: {e}")
+                if lane.empty():
+                    break
+                job = lane.get_nowait()
+        finally:
+            self.running[key] -= 1
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {key: {"running": self.running[key], "queued": lane.qsize()} for key, lane in self.lanes.items()}
+
+
+class Pipeline:
+    """Stages run in order, each fed only by the one before it."""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+
+    def start(self) -> None:
+        for stage in self.stages:
+            stage.start()
+
+    async def join(self) -> None:
+        """Wait until every queued job has passed through every stage."""
+        # Upstream jobs finish before their handlers return, so once a stage
+        # is drained nothing new can reach the stages after it
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def stop(self) -> None:
+        for stage in self.stages:
+            await stage.stop()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.get_stats() for stage in self.stages}
@@ -0,0 +1,219 @@
+# app/utils/price_runs.py - Persisted, resumable price check run records
+
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Set
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from database.database import db
+from utils.leases import WORKER_ID
+
+# Load environment variables
+load_dotenv()
+
+# How often a running cycle saves its checkpoint and progress
+PRICE_RUN_CHECKPOINT_SECONDS = float(os.getenv('PRICE_RUN_CHECKPOINT_SECONDS', '10'))
+
+# An interrupted run older than this is abandoned instead of resumed
+PRICE_RUN_RESUME_HOURS = float(os.getenv('PRICE_RUN_RESUME_HOURS', '12'))
+
+# One document per run: status, checkpoint and progress
+run_collection = db.price_runs
+
+
+class RunCheckpoint:
+    """
+    Progress of a running price check cycle, saved to its run record.
+
+    Items are scanned in _id order but finish out of order, so the checkpoint
+    is the highest _id below which every scanned item has finished. A resumed
+    run scans from there; items past the checkpoint that had already finished
+    are recognised by the run id their links carry (RetailerLink.last_run_id).
+
+    Saves only land while the run record carries this process's fencing
+    token; a process that resumes the run stores its own, newer token.
+    """
+
+    def __init__(self, record: Dict[str, Any]):
+        self.run_id: str = record["_id"]
+        self.kind: str = record["kind"]
+        self.fencing_token: int = record["fencing_token"]
+        self.checkpoint: Optional[ObjectId] = record.get("checkpoint")
+        self.items_done: int = record.get("items_done", 0)
+        self.links_done: int = record.get("links_done", 0)
+        self._pending: Deque[ObjectId] = deque()
+        self._finished: Set[ObjectId] = set()
+        self._last_saved = time.monotonic()
+        self._saving = False
+
+    def scan_filter(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Narrow an item query to the items after the checkpoint."""
+        if self.checkpoint is None:
+            return query
+        return {**query, "_id": {"$gt": self.checkpoint}}
+
+    def started(self, item_id: ObjectId) -> None:
+        """Note an item taken from the scan, in _id order."""
+        self._pending.append(item_id)
+
+    async def finished(self, item_id: ObjectId, links: int, count: bool = True) -> None:
+        """
+        Note an item whose checked links are written, saving progress now and then.
+
+        Pass count=False for an item finished before the run was resumed, so
+        it moves the checkpoint without being counted twice.
+        """
+        self._finished.add(item_id)
+        if count:
+            self.items_done += 1
+            self.links_done += links
+
+        while self._pending and self._pending[0] in self._finished:
+            self.checkpoint = self._pending.popleft()
+            self._finished.discard(self.checkpoint)
+
+        if time.monotonic() - self._last_saved >= PRICE_RUN_CHECKPOINT_SECONDS and not self._saving:
+            await self.save()
+
+    async def save(self, **fields: Any) -> None:
+        self._saving = True
+        try:
+            result = await run_collection.update_one(
+                {"_id": self.run_id, "fencing_token": self.fencing_token},
+                {"$set": {
+                    "checkpoint": self.checkpoint,
+                    "items_done": self.items_done,
+                    "links_done": self.links_done,
+                    "worker": WORKER_ID,
+                    "updated_at": datetime.now(),
+                    **fields
+                }}
+            )
+            self._last_saved = time.monotonic()
+            if result.matched_count == 0:
+                print(f"Run {self.run_id} was taken over by another replica; not saving its checkpoint")
+        except Exception as e:
+            print(f"Error saving checkpoint of run {self.run_id}: {e}")
+        finally:
+            self._saving = False
+
+    async def complete(self, summary: Dict[str, Any]) -> None:
+        await self.save(status="completed", finished_at=datetime.now(), summary=summary)
+
+
+async def start_or_resume_run(kind: str, total_items: int, fencing_token: int) -> RunCheckpoint:
+    """
+    Resume the interrupted run of this kind, or start a new one.
+
+    Callers hold the kind's job lock, so a run still marked running belongs
+    to a process that stopped before finishing it, or lost the lock. The
+    lock's fencing token is stored on the run so that process's checkpoint
+    writes are refused from now on.
+    """
+    now = datetime.now()
+    interrupted = await run_collection.find_one({"kind": kind, "status": "running"})
+
+    if interrupted and interrupted["started_at"] < now - timedelta(hours=PRICE_RUN_RESUME_HOURS):
+        await run_collection.update_one(
+            {"_id": interrupted["_id"]},
+            {"$set": {"status": "abandoned", "finished_at": now}}
+        )
+        interrupted = None
+
+    if interrupted:
+        await run_collection.update_one(
+            {"_id": interrupted["_id"]},
+            {
+                "$set": {
+                    "worker": WORKER_ID,
+                    "fencing_token": fencing_token,
+                    "updated_at": now,
+                    "resumed_at": now,
+                    "items_done_at_resume": interrupted.get("items_done", 0)
+                },
+                "$inc": {"resumes": 1}
+            }
+        )
+        print(f"Resuming {kind} run {interrupted['_id']} after item {interrupted.get('checkpoint')}")
+        return RunCheckpoint({**interrupted, "fencing_token": fencing_token})
+
+    record = {
+        "_id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "running",
+        "worker": WORKER_ID,
+        "fencing_token": fencing_token,
+        "started_at": now,
+        "updated_at": now,
+        "resumed_at": now,
+        "total_items": total_items,
+        "items_done": 0,
+        "items_done_at_resume": 0,
+        "links_done": 0,
+        "checkpoint": None,
+        "resumes": 0
+    }
+    await run_collection.insert_one(record)
+    return RunCheckpoint(record)
+
+
+async def has_interrupted_run(kind: str) -> bool:
+    """Check for a run of this kind that stopped before finishing and can still be resumed."""
+    cutoff = datetime.now() - timedelta(hours=PRICE_RUN_RESUME_HOURS)
+    return await run_collection.count_documents(
+        {"kind": kind, "status": "running", "started_at": {"$gte": cutoff}}, limit=1
+    ) > 0
+
+
+def describe_run(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add progress percentage and ETA to a run record.
+
+    The ETA extrapolates the rate since the run was last (re)started.
+    """
+    total = record.get("total_items") or 0
+    done = record.get("items_done", 0)
+    progress = min(100.0, done / total * 100) if total else 100.0
+    eta_seconds = None
+
+    if record.get("status") == "running":
+        session_done = done - record.get("items_done_at_resume", 0)
+        elapsed = (record["updated_at"] - record["resumed_at"]).total_seconds()
+        if session_done > 0 and elapsed > 0:
+            eta_seconds = round(max(0, total - done) * elapsed / session_done)
+
+    return {
+        "run_id": record["_id"],
+        "kind": record["kind"],
+        "status": record["status"],
+        "worker": record.get("worker"),
+        "started_at": record["started_at"],
+        "updated_at": record.get("updated_at"),
+        "finished_at": record.get("finished_at"),
+        "resumes": record.get("resumes", 0),
+        "total_items": total,
+        "items_done": done,
+        "links_done": record.get("links_done", 0),
+        "progress_percent": round(progress, 1),
+        "eta_seconds": eta_seconds,
+        "checkpoint": str(record["checkpoint"]) if record.get("checkpoint") else None
+    }
+
+
+async def get_run_status(run_id: str) -> Optional[Dict[str, Any]]:
+    """Get a run's status, progress percentage and ETA, or None if there is no such run."""
+    record = await run_collection.find_one({"_id": run_id})
+    return describe_run(record) if record else None
+
+
+async def get_recent_runs(limit: int = 10) -> List[Dict[str, Any]]:
+    """Get the latest runs, running ones first, then newest first."""
+    running = await run_collection.find({"status": "running"}).sort("started_at", -1).to_list(length=limit)
+    finished = await run_collection.find(
+        {"status": {"$ne": "running"}}
+    ).sort("started_at", -1).limit(limit).to_list(length=limit)
+    return [describe_run(record) for record in (running + finished)[:limit]]
@@ -1,73 +1,580 @@
 # app/utils/price_tracker.py - Price tracking and notification functions
 
 import asyncio
+import codecs
+import math
 import os
 import re
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Union
 import aiohttp
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from pymongo import UpdateOne
 
-from database.database import Item, PriceUpdate, Alert, User, PriceHistory, RetailerLink
+from database.database import Item, ItemPriceCheck, PriceUpdate, Alert, User, PriceHistory, RetailerLink
+from utils.affiliate import generate_affiliate_link
+from utils.check_priority import is_due, next_check_at, scheduled_check_at
+from utils.check_timings import LinkTiming, TimingStats, record_link_timing, record_stage, save_run_report
+from utils.circuit_breaker import get_circuit_breaker
 from utils.email import send_price_alert_email
+from utils.job_lock import job_lock
+from utils.leases import PRICE_LEASE_SECONDS, WORKER_ID, claim_due_items, claim_items, lease_release, release_items, renew_leases
+from utils.html_parser import parse_html
+from utils.http_client import get_http_session
+from utils.parse_pool import PRICE_PARSE_WORKERS, parse_page_off_loop
+from utils.price_runs import RunCheckpoint, start_or_resume_run
+from utils.pipeline import Lanes, Pipeline, Stage
+from utils.product_urls import extract_product_key, link_key
+from utils.short_links import is_short_link, rewrite_short_link
+from utils.page_cache import get_validators, conditional_headers, store_validators, record_lookup
+from utils.rate_limiter import get_retailer_bucket, parse_retry_after
+from utils.structured_data import find_structured_price, unscanned_start
 
 # Load environment variables
 load_dotenv()
 
+# Concurrency limits for a price check cycle
+PRICE_CHECK_CONCURRENCY = int(os.getenv('PRICE_CHECK_CONCURRENCY', '20'))
+PRICE_CHECK_RETAILER_CONCURRENCY = int(os.getenv('PRICE_CHECK_RETAILER_CONCURRENCY', '4'))
 
-async def check_prices_and_notify() -> Dict[str, int]:
+# Workers per price check pipeline stage (fetch uses PRICE_CHECK_CONCURRENCY),
+# and how many jobs may wait between stages
+PRICE_PIPELINE_PARSE_WORKERS = int(os.getenv('PRICE_PIPELINE_PARSE_WORKERS', str(max(PRICE_PARSE_WORKERS, 1) * 2)))
+PRICE_PIPELINE_PERSIST_WORKERS = int(os.getenv('PRICE_PIPELINE_PERSIST_WORKERS', '4'))
+PRICE_PIPELINE_NOTIFY_WORKERS = int(os.getenv('PRICE_PIPELINE_NOTIFY_WORKERS', '2'))
+PRICE_PIPELINE_QUEUE_SIZE = int(os.getenv('PRICE_PIPELINE_QUEUE_SIZE', '100'))
+
+# Items fetched per cursor batch in a full cycle
+PRICE_SCAN_BATCH_SIZE = int(os.getenv('PRICE_SCAN_BATCH_SIZE', '100'))
+
+# Most items the due-link dispatcher checks per run, and how many it leases at once
+PRICE_QUEUE_MAX_ITEMS = int(os.getenv('PRICE_QUEUE_MAX_ITEMS', '500'))
+PRICE_LEASE_BATCH_SIZE = int(os.getenv('PRICE_LEASE_BATCH_SIZE', '100'))
+
+# Size of the chunks product pages are read in, and the most read per page
+PRICE_STREAM_CHUNK_SIZE = int(os.getenv('PRICE_STREAM_CHUNK_SIZE', '16384'))
+PRICE_MAX_PAGE_BYTES = int(os.getenv('PRICE_MAX_PAGE_BYTES', '4194304'))
+
+# Text that marks the element each retailer's first price selector matches
+RETAILER_PRICE_MARKERS = {
+    'Amazon': 'a-offscreen',
+    'Walmart': 'itemprop="price"',
+    'Target': 'data-test="product-price"',
+    'Best Buy': 'priceView-customer-price'
+}
+
+# Text found only on bot-challenge pages served instead of the product
+BLOCKED_PAGE_MARKERS = [b'/errors/validateCaptcha', b'<title>Robot Check</title>', b'px-captcha', b'captcha-delivery.com']
+
+# Counts of which extraction tier resolved each price, per retailer
+_tier_stats: Dict[str, Dict[str, int]] = {}
+
+# Bytes read per check and why reading stopped
+_read_stats = {"checks": 0, "total_bytes": 0, "peak_bytes": 0, "stopped": {}}
+
+# Pipeline of the current (or last) run of each kind, for stage stats
+_pipelines: Dict[str, Pipeline] = {}
+
+
+async def check_prices_and_notify() -> Dict[str, Any]:
     """
     Check prices for all tracked items and send notifications if prices have dropped.
 
+    Items run through a PriceCheckRun pipeline, so a slow email never holds up
+    the next fetch. Fetches are bounded by the fetch stage's worker count and
+    a per-retailer limit. Each item is loaded once and written at most once per cycle, so every
+    item ends up in the same state as with a sequential run. Links that point
+    at the same product are fetched once and the price is shared by every item.
+
+    Only one replica runs a full cycle at a time; the others return immediately.
+    If this replica loses the lock mid-cycle, the cycle stops (see utils.job_lock).
+
     Returns:
-        Dict with counts of checked items and found price drops
+        Dict with counts of checked items and found price drops, plus the
+        cycle's throughput, dedup ratio, per-link latency percentiles and
+        per-stage queue stats
+    """
+    async with job_lock("price_cycle") as lock:
+        if lock is None:
+            print("A price check cycle is already running on another replica")
+            return {"items_checked": 0, "price_drops_found": 0}
+
+        return await run_price_cycle(lock.token)
+
+
+class FetchedPage:
+    """A product page read by fetch_page, with its price if fetching already found it."""
+
+    def __init__(
+            self,
+            url: str,
+            retailer: str,
+            timing: LinkTiming,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None
+    ):
+        self.url = url
+        self.retailer = retailer
+        self.timing = timing
+        self.etag = etag
+        self.last_modified = last_modified
+        self.price: Optional[float] = None
+        self.tier: Optional[str] = None
+        self.body: Optional[bytes] = None
+        self.encoding = 'utf-8'
+
+
+class ItemCheck:
+    """An item moving through a PriceCheckRun, with the prices found so far."""
+
+    def __init__(self, item: Union[Item, ItemPriceCheck], indexes: List[int]):
+        self.item = item
+        self.indexes = indexes
+        self.prices: Dict[int, Optional[float]] = {}
+        # Links skipped because their retailer's circuit is open, and when to retry them
+        self.retry_at: Dict[int, datetime] = {}
+
+
+class PriceCheckRun:
+    """
+    A price check run as a pipeline of fetch, parse, persist and notify stages.
+
+    Each stage has its own workers and a bounded queue (see utils.pipeline),
+    so a full parse or persist queue holds back fetching, and a full fetch
+    queue holds back submit() and with it the item scan. Fetching stops early
+    when the page shows its price (304 or structured data); only the rest go
+    through the parse stage. An item is persisted once every one of its
+    links has a price (or failed), and its drops are then queued for notifying.
+
+    At most PRICE_CHECK_RETAILER_CONCURRENCY fetch workers work on one
+    retailer at a time; its other links wait on the retailer's lane (see
+    utils.pipeline.Lanes), so a slow or throttled retailer never holds up
+    fetches from the rest.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            due_only: bool = False,
+            checkpoint: Optional[RunCheckpoint] = None,
+            lease_owner: str = WORKER_ID
+    ):
+        self.name = name
+        self.due_only = due_only
+        self.checkpoint = checkpoint
+        self.run_id = checkpoint.run_id if checkpoint else None
+        self.timings = TimingStats()
+        self.started_at = datetime.now()
+        self.items_checked = 0
+        self.price_drops_found = 0
+        self.links_requested = 0
+        self.latencies: List[float] = []
+        # Prices found this run, and links waiting on a fetch already started,
+        # keyed by product key (or canonical URL)
+        self.prices: Dict[str, Optional[float]] = {}
+        self.waiting: Dict[str, List[Tuple[ItemCheck, int]]] = {}
+        # Leased items not yet persisted, and items skipped because another
+        # run holds their lease. Each run of this process leases as its own
+        # owner, so the due-link run and a full cycle never release each other's.
+        self.lease_owner = lease_owner
+        self.leased: Dict[Any, ItemPriceCheck] = {}
+        self.leased_elsewhere = 0
+
+        self.fetch_stage = Stage("fetch", self.fetch, PRICE_CHECK_CONCURRENCY, PRICE_PIPELINE_QUEUE_SIZE)
+        self.retailer_lanes = Lanes(self.fetch_link, PRICE_CHECK_RETAILER_CONCURRENCY, PRICE_PIPELINE_QUEUE_SIZE)
+        self.parse_stage = Stage("parse", self.parse, PRICE_PIPELINE_PARSE_WORKERS, PRICE_PIPELINE_QUEUE_SIZE)
+        self.persist_stage = Stage("persist", self.persist, PRICE_PIPELINE_PERSIST_WORKERS, PRICE_PIPELINE_QUEUE_SIZE)
+        self.notify_stage = Stage("notify", self.notify, PRICE_PIPELINE_NOTIFY_WORKERS, PRICE_PIPELINE_QUEUE_SIZE)
+        self.pipeline = Pipeline([self.fetch_stage, self.parse_stage, self.persist_stage, self.notify_stage])
+
+    def start(self) -> None:
+        _pipelines[self.name] = self.pipeline
+        self.pipeline.start()
+
+    async def finish(self) -> None:
+        """Wait for everything submitted to be notified, then stop the workers."""
+        try:
+            await self.pipeline.join()
+        finally:
+            await self.pipeline.stop()
+
+    async def abort(self) -> None:
+        """Stop the workers at once, dropping whatever is still queued."""
+        await self.pipeline.stop()
+
+    async def submit(self, item: Union[Item, ItemPriceCheck]) -> None:
+        """Queue an item's links for fetching, waiting while the fetch stage is full."""
+        try:
+            self.items_checked += 1
+            now = datetime.now()
+
+            # Resolve short links first so they share fetches with their full URLs
+            for link in item.retailer_links:
+                if is_short_link(link.url):
+                    await rewrite_short_link(item, link)
+
+            indexes = [
+                index for index, link in enumerate(item.retailer_links)
+                if (not self.due_only or is_due(item, link, now))
+                and (self.run_id is None or link.last_run_id != self.run_id)
+            ]
+            self.links_requested += len(indexes)
+            check = ItemCheck(item, indexes)
+
+            if self.checkpoint:
+                self.checkpoint.started(item.id)
+
+                # Every link was checked, and the item counted, before this run was interrupted
+                if not indexes:
+                    await self.checkpoint.finished(item.id, 0, count=False)
+                    return
+
+            # Nothing to fetch, but links that predate scheduling still get scheduled
+            if not indexes:
+                await self.persist_stage.put(check)
+
+            for index in indexes:
+                breaker = get_circuit_breaker(item.retailer_links[index].name)
+                if breaker.is_open():
+                    await self.skip_link(check, index)
+                else:
+                    await self.fetch_stage.put((check, index))
+
+        except Exception as e:
+            print(f"Error checking prices for item {item.id}: {e}")
+
+    async def submit_unleased(self, items: List[ItemPriceCheck]) -> None:
+        """Lease a batch of scanned items and submit the ones no other run is checking."""
+        claimed = await claim_items(items, self.lease_owner)
+        self.leased_elsewhere += len(items) - len(claimed)
+        for item in claimed:
+            self.leased[item.id] = item
+            await self.submit(item)
+
+    async def fetch(self, job: Tuple[ItemCheck, int]) -> None:
+        check, index = job
+        link = check.item.retailer_links[index]
+        key = link_key(link.url, link.name, link.product_key)
+
+        if key in self.prices:
+            await self.resolve_link(check, index, self.prices[key])
+            return
+        if key in self.waiting:
+            self.waiting[key].append((check, index))
+            return
+        self.waiting[key] = [(check, index)]
+
+        await self.retailer_lanes.run(link.name, (key, link))
+
+    async def fetch_link(self, job: Tuple[str, RetailerLink]) -> None:
+        """Fetch one product page once the retailer has a free slot and its rate limit allows."""
+        key, link = job
+        breaker = get_circuit_breaker(link.name)
+
+        # Refusals aren't kept in self.prices, so later links with this key ask the breaker again
+        if not breaker.allow():
+            for waiting_check, waiting_index in self.waiting.pop(key):
+                await self.skip_link(waiting_check, waiting_index, counted=True)
+            return
+
+        probe = breaker.state == 'half_open'
+        timing = LinkTiming(link.name)
+        try:
+            try:
+                await get_retailer_bucket(link.name).acquire()
+                started = time.perf_counter()
+                try:
+                    page = await fetch_page(link.url, link.name, timing)
+                finally:
+                    self.latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                # Links waiting on this fetch must still be released
+                print(f"Error fetching price from {link.url}: {e}")
+                page = None
+
+            if page is None:
+                record_link_outcome(timing, self.timings)
+                await self.complete(key, None)
+            elif page.body is not None and not probe:
+                await self.parse_stage.put((key, page))
+            else:
+                # A probe is parsed here, so its outcome is known before its slot is freed
+                await self.parse((key, page))
+        finally:
+            # However the check ended, including a run aborted mid-fetch
+            if probe:
+                breaker.end_probe()
+
+    async def parse(self, job: Tuple[str, FetchedPage]) -> None:
+        key, page = job
+        price = await parse_fetched_page(page)
+        record_link_outcome(page.timing, self.timings)
+        await self.complete(key, price)
+
+    async def skip_link(self, check: ItemCheck, index: int, counted: bool = False) -> None:
+        """Resolve a link of a retailer whose circuit is open without fetching it, to be retried when it closes."""
+        breaker = get_circuit_breaker(check.item.retailer_links[index].name)
+        if not counted:
+            breaker.skip()
+
+        timing = LinkTiming(breaker.retailer)
+        timing.outcome = 'circuit_open'
+        record_link_timing(timing, self.timings)
+
+        check.retry_at[index] = breaker.retry_at()
+        await self.resolve_link(check, index, None)
+
+    async def complete(self, key: str, price: Optional[float]) -> None:
+        """Hand a fetched price to every link that was waiting on it."""
+        self.prices[key] = price
+        for check, index in self.waiting.pop(key, []):
+            await self.resolve_link(check, index, price)
+
+    async def resolve_link(self, check: ItemCheck, index: int, price: Optional[float]) -> None:
+        check.prices[index] = price
+        if len(check.prices) == len(check.indexes):
+            await self.persist_stage.put(check)
+
+    async def persist(self, check: ItemCheck) -> None:
+        """
+        Write an item's link updates in one round trip and record its price drops.
+
+        The checkpoint moves past the item even if the write fails, so one bad
+        item can't hold it back for the rest of the run; the item's links keep
+        their old run id and are checked again by the next cycle.
+        """
+        item = check.item
+        updates = []
+        price_updates = []
+        links_written = 0
+
+        try:
+            for index in check.indexes:
+                price = check.prices.get(index)
+                if price is None:
+                    continue
+
+                update, price_update = apply_link_price(item, index, price)
+                if update:
+                    updates.append(update)
+                if price_update:
+                    price_updates.append(price_update)
+
+            updates.extend(schedule_next_checks(item, check.indexes, self.run_id, check.retry_at))
+
+            # The item is rescheduled, so its lease can go in the same round trip
+            leased = item.id in self.leased
+            if leased:
+                updates.append(lease_release(item, self.lease_owner))
+
+            if updates:
+                started = time.perf_counter()
+                await write_item_prices(item, updates, price_updates)
+                seconds = time.perf_counter() - started
+                for retailer in {item.retailer_links[index].name for index in check.indexes}:
+                    record_stage(retailer, 'write', seconds, self.timings)
+
+            if leased:
+                del self.leased[item.id]
+            links_written = len(check.indexes)
+
+        finally:
+            if self.checkpoint:
+                await self.checkpoint.finished(item.id, links_written)
+
+        if price_updates:
+            self.price_drops_found += len(price_updates)
+            await self.notify_stage.put((item, price_updates))
+
+    async def notify(self, job: Tuple[Union[Item, ItemPriceCheck], List[PriceUpdate]]) -> None:
+        item, price_updates = job
+        await notify_price_drops(item, price_updates, self.timings)
+
+
+async def run_price_cycle(fencing_token: int) -> Dict[str, Any]:
+    """
+    Check every item with retailer links (see check_prices_and_notify).
+
+    Items are streamed from a cursor in batches of PRICE_SCAN_BATCH_SIZE,
+    reading only the fields a price check needs, and the scan waits whenever
+    the pipeline's fetch queue is full, so memory stays flat however many
+    items are tracked.
+
+    The run is recorded in utils.price_runs with a checkpoint, so a cycle
+    interrupted by a restart is resumed by the next one instead of starting
+    over from the first item. Checkpoint writes carry the job lock's fencing
+    token, so they stop landing once another replica has taken the cycle over.
+
+    Each batch of scanned items is leased like check_due_prices' items. Items
+    another worker's due-link run holds are left to it, and the due-link runs
+    can't claim items the cycle holds, so no page is fetched twice and no
+    item is written by both.
     """
     try:
-        # Get all items with retailer links
-        items = await Item.find(
-            {"retailer_links.0": {"$exists": True}}
-        ).to_list()
+        started = time.perf_counter()
+        collection = Item.get_motor_collection()
+        query = {"retailer_links.url": {"$exists": True}}
+        checkpoint = await start_or_resume_run("price_cycle", await collection.count_documents(query), fencing_token)
+        run = PriceCheckRun("price_cycle", checkpoint=checkpoint, lease_owner=f"{WORKER_ID}:price_cycle")
+        run.start()
+        keep_alive = asyncio.create_task(keep_leases(run))
+
+        try:
+            try:
+                # Stream items with retailer links in _id order from the checkpoint
+                cursor = collection.find(
+                    checkpoint.scan_filter(query),
+                    projection=ItemPriceCheck.Settings.projection
+                ).sort("_id", 1).batch_size(PRICE_SCAN_BATCH_SIZE)
+
+                batch = []
+                async for document in cursor:
+                    batch.append(ItemPriceCheck.parse_obj(document))
+                    if len(batch) >= PRICE_SCAN_BATCH_SIZE:
+                        await run.submit_unleased(batch)
+                        batch = []
+                await run.submit_unleased(batch)
+            except asyncio.CancelledError:
+                # The job lock was lost; the replica that took it over resumes from the checkpoint
+                await run.abort()
+                raise
+            except Exception:
+                await run.finish()
+                raise
+
+            await run.finish()
+        finally:
+            keep_alive.cancel()
+            # Items dropped by an abort, or that failed before they were persisted
+            await release_items(list(run.leased.values()), run.lease_owner)
+
+        stats = {
+            **summarize_cycle(run, started),
+            "items_leased_elsewhere": run.leased_elsewhere,
+            "run_id": checkpoint.run_id
+        }
+        print(f"Price check cycle finished: {stats}")
+        await checkpoint.complete(stats)
+        await save_run_report(run.name, run.started_at, stats, run.timings)
 
-        items_checked = 0
-        price_drops_found = 0
+        return stats
 
-        for item in items:
-            for i, link in enumerate(item.retailer_links):
-                price_dropped = await check_price_for_link(str(item.id), link)
-                if price_dropped:
-                    price_drops_found += 1
+    except Exception as e:
+        print(f"Error checking prices: {e}")
+        return {"items_checked": 0, "price_drops_found": 0}
 
-            items_checked += 1
 
-        return {
-            "items_checked": items_checked,
-            "price_drops_found": price_drops_found
-        }
+async def check_due_prices() -> Dict[str, Any]:
+    """
+    Check only the retailer links whose next check time has passed.
+
+    Items are leased from the next_check_at index most overdue first, in
+    batches of PRICE_LEASE_BATCH_SIZE up to PRICE_QUEUE_MAX_ITEMS per run, so
+    the fetch budget goes to volatile and watched items before quiet ones and
+    any number of worker processes can run this without fetching twice.
+    Checked links are rescheduled with an interval from utils.check_priority.
+
+    An item's lease is released in the same write that reschedules it. Leases
+    of items still waiting in the pipeline are renewed every third of
+    PRICE_LEASE_SECONDS, so a throttled run never outlives them.
+
+    Returns:
+        Dict with the same counts as check_prices_and_notify
+    """
+    try:
+        started = time.perf_counter()
+        run = PriceCheckRun("due_prices", due_only=True)
+        claimed = 0
+        run.start()
+        keep_alive = asyncio.create_task(keep_leases(run))
+
+        try:
+            while claimed < PRICE_QUEUE_MAX_ITEMS:
+                items = await claim_due_items(min(PRICE_LEASE_BATCH_SIZE, PRICE_QUEUE_MAX_ITEMS - claimed))
+                if not items:
+                    break
+
+                claimed += len(items)
+                for item in items:
+                    run.leased[item.id] = item
+                    await run.submit(item)
+        finally:
+            try:
+                await run.finish()
+            finally:
+                keep_alive.cancel()
+                # Items that failed before they were persisted
+                await release_items(list(run.leased.values()), run.lease_owner)
+
+        stats = summarize_cycle(run, started)
+        if run.items_checked:
+            print(f"Due price checks finished: {stats}")
+            await save_run_report(run.name, run.started_at, stats, run.timings)
+
+        return stats
 
     except Exception as e:
-        print(f"Error checking prices: {e}")
+        print(f"Error checking due prices: {e}")
         return {"items_checked": 0, "price_drops_found": 0}
 
 
+async def keep_leases(run: PriceCheckRun) -> None:
+    """Renew the leases of a run's items until it is cancelled."""
+    while True:
+        await asyncio.sleep(PRICE_LEASE_SECONDS / 3)
+        try:
+            await renew_leases(list(run.leased.values()), run.lease_owner)
+        except Exception as e:
+            print(f"Error renewing price check leases: {e}")
+
+
+def summarize_cycle(run: PriceCheckRun, started: float) -> Dict[str, Any]:
+    """Build the run summary: counts, throughput, dedup ratio, latency percentiles and stage stats."""
+    duration = time.perf_counter() - started
+    latencies = run.latencies
+    unique_urls = len(run.prices)
+    return {
+        "items_checked": run.items_checked,
+        "price_drops_found": run.price_drops_found,
+        "links_total": run.links_requested,
+        "unique_urls": unique_urls,
+        "dedup_ratio": round(run.links_requested / unique_urls, 2) if unique_urls else 0.0,
+        "links_checked": len(latencies),
+        "duration_seconds": round(duration, 3),
+        "links_per_second": round(len(latencies) / duration, 2) if duration > 0 else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "stages": run.pipeline.get_stats()
+    }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of a list of seconds, rounded to ms."""
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return round(ordered[rank], 3)
+
+
 async def check_price_for_link(item_id: str, retailer_link: RetailerLink) -> bool:
     """
     Check the price for a specific retailer link and update the item.
     Returns True if price has dropped.
+
+    Stage timings (see utils.check_timings) are recorded for every link fetched.
     """
+    timing = None
+
     try:
         item = await Item.get(item_id)
         if not item:
             return False
 
-        # Extract price from the retailer's webpage
-        price = await extract_price(retailer_link.url, retailer_link.name)
-
-        # If price couldn't be extracted, return
-        if price is None:
-            return False
-
-        # Update the item with the new price info
         index = -1
         for i, link in enumerate(item.retailer_links):
             if link.url == retailer_link.url:
@@ -77,72 +584,260 @@ async def check_price_for_link(item_id: str, retailer_link: RetailerLink) -> boo
         if index == -1:
             return False
 
-        old_price = item.retailer_links[index].current_price
-        price_dropped = False
-
-        # Generate affiliate link if it doesn't exist yet
-        if not item.retailer_links[index].affiliate_url and item.retailer_links[index].affiliate_enabled:
-            affiliate_url = generate_affiliate_link(retailer_link.url, retailer_link.name)
-            if affiliate_url:
-                item.retailer_links[index].affiliate_url = affiliate_url
-                item.retailer_links[index].affiliate_program = retailer_link.name.lower()
-
-        # If this is the first time checking or price has changed
-        if old_price is None or price != old_price:
-            # Update retailer link
-            item.retailer_links[index].current_price = price
-            item.retailer_links[index].last_checked = datetime.now()
-
-            # Add to price history if price is new or has changed
-            if old_price is None or price < old_price:
-                # Add to price history
-                item.price_history.append(PriceHistory(
-                    price=price,
-                    date=datetime.now()
+        # Extract price from the retailer's webpage
+        timing = LinkTiming(retailer_link.name)
+        price = await fetch_link_price(retailer_link, timing=timing)
+
+        # If price couldn't be extracted, return
+        if price is None:
+            return False
+
+        update, price_update = apply_link_price(item, index, price)
+        updates = ([update] if update else []) + schedule_next_checks(item, [index])
+        price_updates = [price_update] if price_update else []
+
+        with timing.stage('write'):
+            await write_item_prices(item, updates, price_updates)
+        await notify_price_drops(item, price_updates)
+
+        return price_update is not None
+
+    except Exception as e:
+        print(f"Error checking price for {retailer_link.url}: {e}")
+        return False
+
+    finally:
+        if timing is not None:
+            record_link_outcome(timing)
+
+
+def schedule_next_checks(
+        item: Union[Item, ItemPriceCheck],
+        checked: List[int],
+        run_id: Optional[str] = None,
+        retry_at: Optional[Dict[int, datetime]] = None
+) -> List[UpdateOne]:
+    """
+    Set next_check_at on the links just checked, and on links that predate
+    scheduling, so the due-link query stops returning them. Links checked by
+    a full cycle also record its run id, so a resumed cycle skips them.
+    Links skipped for an open circuit are retried when it lets checks through.
+    """
+    updates = []
+    next_check = next_check_at(item)
+    retry_at = retry_at or {}
+
+    for index, link in enumerate(item.retailer_links):
+        if index in checked:
+            link.next_check_at = retry_at.get(index, next_check)
+            if run_id:
+                link.last_run_id = run_id
+                updates.append(UpdateOne(
+                    {"_id": item.id, "retailer_links.url": link.url},
+                    {"$set": {
+                        "retailer_links.$.next_check_at": link.next_check_at,
+                        "retailer_links.$.last_run_id": run_id
+                    }}
                 ))
+                continue
+        elif link.next_check_at is None:
+            link.next_check_at = scheduled_check_at(item, link)
+            if link.next_check_at is None:
+                continue
+        else:
+            continue
+
+        updates.append(UpdateOne(
+            {"_id": item.id, "retailer_links.url": link.url},
+            {"$set": {"retailer_links.$.next_check_at": link.next_check_at}}
+        ))
 
-                # If price has dropped
-                if old_price is not None and price < old_price:
-                    price_dropped = True
-                    item.retailer_links[index].price_dropped = True
+    return updates
 
-                    # Set item on sale flag
-                    item.is_on_sale = True
 
-                    # Calculate percentage change
-                    percentage_change = ((old_price - price) / old_price) * 100
+async def fetch_link_price(retailer_link: RetailerLink, timing: Optional[LinkTiming] = None) -> Optional[float]:
+    """Fetch the current price for a retailer link."""
+    # Don't spend a fetch on a retailer whose circuit is open
+    breaker = get_circuit_breaker(retailer_link.name)
+    if not breaker.allow():
+        if timing is not None:
+            timing.outcome = 'circuit_open'
+        return None
+
+    probe = breaker.state == 'half_open'
+    try:
+        await get_retailer_bucket(retailer_link.name).acquire()
+        return await extract_price(retailer_link.url, retailer_link.name, timing)
+    finally:
+        if probe:
+            breaker.end_probe()
 
-                    # Record the price update
-                    price_update = PriceUpdate(
-                        item_id=item_id,
-                        retailer=item.retailer_links[index].name,
-                        old_price=old_price,
-                        new_price=price,
-                        percentage_change=percentage_change
-                    )
-                    await price_update.insert()
 
-                    # Send notifications to subscribers
-                    await notify_subscribers(item, price_update)
+def apply_link_price(item: Union[Item, ItemPriceCheck], index: int, price: float) -> Tuple[Optional[UpdateOne], Optional[PriceUpdate]]:
+    """
+    Apply a freshly extracted price to one of the item's retailer links.
 
-            # Update item's current price with the lowest price available
-            current_prices = [link.current_price for link in item.retailer_links
-                              if link.current_price is not None]
-            if current_prices:
-                item.current_price = min(current_prices)
+    The in-memory item is updated so notifications see the new state, and a
+    targeted update for the matching `retailer_links.$` entry is returned so
+    the write size doesn't grow with `price_history` or `subscribers`.
 
-            # Save the item
-            await item.save()
+    Returns:
+        Tuple of the update to send (None if nothing changed) and the (not yet
+        inserted) PriceUpdate if the price dropped
+    """
+    link = item.retailer_links[index]
+    old_price = link.current_price
+    price_update = None
+    link_filter = {"_id": item.id, "retailer_links.url": link.url}
+    set_fields = {}
+
+    # Generate affiliate link if it doesn't exist yet
+    if not link.affiliate_url and link.affiliate_enabled:
+        affiliate_url = generate_affiliate_link(link.url, link.name)
+        if affiliate_url:
+            link.affiliate_url = affiliate_url
+            link.affiliate_program = link.name.lower()
+            set_fields["retailer_links.$.affiliate_url"] = link.affiliate_url
+            set_fields["retailer_links.$.affiliate_program"] = link.affiliate_program
+
+    # Backfill the product key for links stored before keys existed
+    if not link.product_key:
+        product_key = extract_product_key(link.url, link.name)
+        if product_key:
+            link.product_key = product_key
+            set_fields["retailer_links.$.product_key"] = product_key
+
+    # Nothing to record if the price hasn't changed
+    if old_price is not None and price == old_price:
+        return (UpdateOne(link_filter, {"$set": set_fields}) if set_fields else None), None
+
+    # Update retailer link
+    link.current_price = price
+    link.last_checked = datetime.now()
+    set_fields["retailer_links.$.current_price"] = price
+    set_fields["retailer_links.$.last_checked"] = link.last_checked
+    update = {"$set": set_fields}
+
+    # Add to price history if price is new or has dropped
+    if old_price is None or price < old_price:
+        history_entry = PriceHistory(
+            price=price,
+            date=datetime.now()
+        )
+        item.price_history.append(history_entry)
+        update["$push"] = {"price_history": history_entry.dict()}
+
+        # A new or lower link price can only lower the item's price. $min
+        # can't be used on an unset price because null sorts below numbers.
+        if item.current_price is None:
+            set_fields["current_price"] = price
+            item.current_price = price
+        else:
+            update["$min"] = {"current_price": price}
+            item.current_price = min(item.current_price, price)
+
+        # If price has dropped
+        if old_price is not None and price < old_price:
+            link.price_dropped = True
+            set_fields["retailer_links.$.price_dropped"] = True
+
+            # Set item on sale flag
+            item.is_on_sale = True
+            set_fields["is_on_sale"] = True
+
+            # Calculate percentage change
+            percentage_change = ((old_price - price) / old_price) * 100
+
+            price_update = PriceUpdate(
+                item_id=str(item.id),
+                retailer=link.name,
+                old_price=old_price,
+                new_price=price,
+                percentage_change=percentage_change
+            )
 
-        return price_dropped
+    return UpdateOne(link_filter, update), price_update
+
+
+async def write_item_prices(
+        item: Union[Item, ItemPriceCheck],
+        updates: List[UpdateOne],
+        price_updates: List[PriceUpdate]
+) -> None:
+    """Write an item's link updates in one round trip and record its price drops."""
+    # A price increase can raise the item's lowest price, which $min can't do,
+    # so recompute it from the stored links in the same batch
+    current_prices = [link.current_price for link in item.retailer_links
+                      if link.current_price is not None]
+    if current_prices and min(current_prices) != item.current_price:
+        item.current_price = min(current_prices)
+        updates.append(UpdateOne(
+            {"_id": item.id},
+            [{"$set": {"current_price": {"$min": "$retailer_links.current_price"}}}]
+        ))
+
+    await Item.get_motor_collection().bulk_write(updates, ordered=True)
+
+    # Record the price updates
+    for price_update in price_updates:
+        await price_update.insert()
+
+
+async def notify_price_drops(
+        item: Union[Item, ItemPriceCheck],
+        price_updates: List[PriceUpdate],
+        timings: Optional[TimingStats] = None
+) -> None:
+    """Send notifications to subscribers for each recorded price drop, timing emails into the run's stats if given."""
+    # Notifications need the whole item, which a projection leaves out
+    if price_updates and isinstance(item, ItemPriceCheck):
+        item = await Item.get(item.id)
+        if not item:
+            return
 
-    except Exception as e:
-        print(f"Error checking price for {retailer_link.url}: {e}")
-        return False
+    for price_update in price_updates:
+        await notify_subscribers(item, price_update, timings)
 
 
-async def extract_price(url: str, retailer: str) -> Optional[float]:
-    """Extract price from retailer website."""
+async def extract_price(url: str, retailer: str, timing: Optional[LinkTiming] = None) -> Optional[float]:
+    """
+    Extract price from retailer website.
+
+    Pages fetched before are requested conditionally; a 304 response reuses
+    the price extracted last time without downloading or parsing the page.
+    The body is streamed and reading stops as soon as a structured-data
+    price shows up; the retailer's selectors only run if none does.
+
+    Stage timings and the outcome go to the given timing, or are recorded
+    straight away if none is given.
+    """
+    link_timing = timing or LinkTiming(retailer)
+    page = await fetch_page(url, retailer, link_timing)
+    price = await parse_fetched_page(page) if page else None
+
+    if timing is None:
+        record_link_outcome(link_timing)
+
+    return price
+
+
+def record_link_outcome(timing: LinkTiming, run_timings: Optional[TimingStats] = None) -> None:
+    """Record a finished link check's timings and feed its outcome to the retailer's circuit breaker."""
+    record_link_timing(timing, run_timings)
+    get_circuit_breaker(timing.retailer).record_outcome(timing.outcome)
+
+
+async def fetch_page(url: str, retailer: str, timing: LinkTiming) -> Optional[FetchedPage]:
+    """
+    Download a product page, stopping early if the price shows up in the stream.
+
+    DNS, connect and download times and, if the fetch fails, the outcome are
+    set on the timing.
+
+    Returns:
+        The page, with its price and tier set if a 304 or structured data
+        resolved it and its body set otherwise, or None if the fetch failed
+    """
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Accept-Language': 'en-US,en;q=0.9',
@@ -151,31 +846,233 @@ async def extract_price(url: str, retailer: str) -> Optional[float]:
         'DNT': '1',  # Do Not Track
     }
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, timeout=10) as response:
-                if response.status != 200:
-                    return None
-
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-
-                # Different extraction strategies based on retailer
-                if retailer == 'Amazon':
-                    return extract_amazon_price(soup)
-                elif retailer == 'Walmart':
-                    return extract_walmart_price(soup)
-                elif retailer == 'Target':
-                    return extract_target_price(soup)
-                elif retailer == 'Best Buy':
-                    return extract_bestbuy_price(soup)
-                else:
-                    # Generic price extraction
-                    return extract_generic_price(soup)
+    bucket = get_retailer_bucket(retailer)
 
+    started = None
+
+    try:
+        cached = await get_validators(url)
+        validator_headers = conditional_headers(cached)
+        headers.update(validator_headers)
+
+        session = get_http_session()
+        started = time.perf_counter()
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10),
+                               trace_request_ctx=timing) as response:
+            # Back off when the retailer tells us we're going too fast
+            if response.status in (429, 503):
+                bucket.record_throttled(parse_retry_after(response.headers.get('Retry-After')))
+                timing.outcome = 'throttled'
+                return None
+
+            bucket.record_success()
+            record_lookup(retailer, bool(validator_headers), response.status == 304)
+
+            # Page unchanged since the last check
+            if response.status == 304 and validator_headers:
+                page = FetchedPage(url, retailer, timing)
+                page.price, page.tier = cached["price"], 'not_modified'
+                return page
+
+            if response.status != 200:
+                timing.outcome = 'server_error' if response.status >= 500 else 'http_error'
+                return None
+
+            page = FetchedPage(url, retailer, timing, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            await read_page_from_stream(response, page)
+            return page
+
+    except asyncio.TimeoutError:
+        bucket.record_throttled()
+        timing.outcome = 'timeout'
+        print(f"Timed out fetching price from {url}")
+        return None
+    except aiohttp.ClientError as e:
+        timing.outcome = 'connection_error'
+        print(f"Error fetching price from {url}: {e}")
+        return None
     except Exception as e:
+        timing.outcome = 'internal_error'
         print(f"Error fetching price from {url}: {e}")
         return None
+    finally:
+        # The request's DNS and connect times are recorded by the session's tracing
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            timing.add('download', max(0.0, elapsed - timing.stages.get('dns', 0.0) - timing.stages.get('connect', 0.0)))
+
+
+async def read_page_from_stream(response: aiohttp.ClientResponse, page: FetchedPage) -> None:
+    """
+    Read a product page in chunks of at most PRICE_MAX_PAGE_BYTES in total.
+
+    Reading stops early when structured data gives a price, or one chunk after
+    the retailer's price marker shows up, since the selectors only need the
+    first matching element. Sets the page's price and tier if structured data
+    gave one, and its body otherwise.
+    """
+    encoding = response.charset or 'utf-8'
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    marker = RETAILER_PRICE_MARKERS.get(page.retailer)
+    chunks = []
+    bytes_read = 0
+    marker_seen = False
+    stop_reason = 'complete'
+    # Unscanned text, kept so a tag or JSON-LD block split across chunks is seen whole
+    tail = ''
+
+    async for chunk in response.content.iter_chunked(PRICE_STREAM_CHUNK_SIZE):
+        chunk = chunk[:PRICE_MAX_PAGE_BYTES - bytes_read]
+        chunks.append(chunk)
+        bytes_read += len(chunk)
+        tail += decoder.decode(chunk)
+
+        found = find_structured_price(tail)
+        if found:
+            record_bytes_read(bytes_read, 'structured')
+            page.price, page.tier = found
+            return
+
+        if marker_seen:
+            stop_reason = 'marker'
+            break
+        marker_seen = marker is not None and marker in tail
+
+        if bytes_read >= PRICE_MAX_PAGE_BYTES:
+            stop_reason = 'cap'
+            break
+
+        tail = tail[unscanned_start(tail):]
+
+    record_bytes_read(bytes_read, stop_reason)
+    page.body = b''.join(chunks)
+    page.encoding = encoding
+
+
+async def parse_fetched_page(page: FetchedPage) -> Optional[float]:
+    """
+    Parse a fetched page if fetching didn't already find its price, and
+    remember the page's validators for the next conditional request.
+    """
+    try:
+        # A bot challenge has no price to find, and counts against the retailer
+        if page.body is not None and any(marker in page.body for marker in BLOCKED_PAGE_MARKERS):
+            page.timing.outcome = 'blocked'
+            page.body = None
+            record_tier(page.retailer, 'none')
+            return None
+
+        if page.body is not None:
+            # Full parse runs in the parser pool so large pages don't stall the API
+            with page.timing.stage('parse'):
+                page.price, page.tier = await parse_page_off_loop(page.body, page.encoding, page.retailer)
+            page.body = None
+
+        record_tier(page.retailer, page.tier)
+        if page.tier == 'not_modified':
+            page.timing.outcome = 'not_modified'
+        else:
+            page.timing.outcome = 'ok' if page.price is not None else 'no_price'
+
+        if page.price is not None and page.tier != 'not_modified':
+            await store_validators(page.url, page.retailer, page.etag, page.last_modified, page.price)
+
+        return page.price
+
+    except Exception as e:
+        page.timing.outcome = 'internal_error'
+        print(f"Error parsing price from {page.url}: {e}")
+        return None
+
+
+def record_bytes_read(bytes_read: int, stop_reason: str) -> None:
+    """Track bytes read per check and why reading stopped."""
+    _read_stats["checks"] += 1
+    _read_stats["total_bytes"] += bytes_read
+    _read_stats["peak_bytes"] = max(_read_stats["peak_bytes"], bytes_read)
+    _read_stats["stopped"][stop_reason] = _read_stats["stopped"].get(stop_reason, 0) + 1
+
+
+def get_read_stats() -> Dict[str, Any]:
+    """
+    Get how much of each product page was read.
+
+    Returns:
+        Dict with the number of checks, peak and average bytes read per check,
+        and counts of why reading stopped (structured, marker, cap, complete)
+    """
+    checks = _read_stats["checks"]
+    return {
+        "checks": checks,
+        "peak_bytes": _read_stats["peak_bytes"],
+        "average_bytes": _read_stats["total_bytes"] / checks if checks > 0 else 0,
+        "max_page_bytes": PRICE_MAX_PAGE_BYTES,
+        "stopped": dict(_read_stats["stopped"])
+    }
+
+
+def get_pipeline_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get queue depth and throughput for each stage of the latest price check runs.
+
+    Returns:
+        Dict keyed by run (price_cycle, due_prices) of stage stats from
+        utils.pipeline.Stage.get_stats
+    """
+    return {name: pipeline.get_stats() for name, pipeline in _pipelines.items()}
+
+
+def extract_price_and_tier(
+        html: str,
+        retailer: str,
+        backend: Optional[str] = None,
+        scan_structured: bool = True
+) -> Tuple[Optional[float], str]:
+    """
+    Extract the price from a full product page, trying structured data before
+    parsing the page and running the retailer's selectors.
+
+    Returns:
+        Tuple of the price (or None) and the tier that resolved it:
+        "json_ld", "opengraph", "microdata", "selectors" or "none"
+    """
+    if scan_structured:
+        found = find_structured_price(html)
+        if found:
+            return found
+
+    soup = parse_html(html, backend)
+
+    # Different extraction strategies based on retailer
+    if retailer == 'Amazon':
+        price = extract_amazon_price(soup)
+    elif retailer == 'Walmart':
+        price = extract_walmart_price(soup)
+    elif retailer == 'Target':
+        price = extract_target_price(soup)
+    elif retailer == 'Best Buy':
+        price = extract_bestbuy_price(soup)
+    else:
+        # Generic price extraction
+        price = extract_generic_price(soup)
+
+    return price, 'selectors' if price is not None else 'none'
+
+
+def record_tier(retailer: str, tier: str) -> None:
+    """Count which extraction tier resolved (or failed to resolve) a retailer's price."""
+    retailer_tiers = _tier_stats.setdefault(retailer, {})
+    retailer_tiers[tier] = retailer_tiers.get(tier, 0) + 1
+
+
+def get_extraction_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Get how often each extraction tier resolved a price, per retailer.
+
+    Returns:
+        Dict keyed by retailer name, mapping tier name to count
+    """
+    return {retailer: dict(tiers) for retailer, tiers in _tier_stats.items()}
 
 
 def extract_amazon_price(soup: BeautifulSoup) -> Optional[float]:
@@ -235,11 +1132,12 @@ def extract_bestbuy_price(soup: BeautifulSoup) -> Optional[float]:
 
 def extract_generic_price(soup: BeautifulSoup) -> Optional[float]:
     """Generic price extraction strategy."""
-    # Try common price patterns across different sites
+    # Try common price patterns across different sites. A labelled price comes
+    # first so a page-wide search doesn't stop at a banner's "orders over $35".
     price_patterns = [
+        r'Price:\s*\$\s*(\d+(?:,\d+)*\.?\d*)',  # Price: $XX.XX
         r'\$\s*(\d+(?:,\d+)*\.?\d*)',  # $XX.XX or $XX
         r'(\d+(?:,\d+)*\.?\d*)\s*USD',  # XX.XX USD or XX USD
-        r'Price:\s*\$\s*(\d+(?:,\d+)*\.?\d*)',  # Price: $XX.XX
         r'(\d+(?:,\d+)*\.?\d*)'  # Just numbers as a fallback
     ]
 
@@ -267,20 +1165,22 @@ def extract_generic_price(soup: BeautifulSoup) -> Optional[float]:
 
 
 def parse_price(price_text: str) -> Optional[float]:
-    """Parse price text into a float."""
+    """Parse price text into a float. For a range such as "$19.99 - $24.99" the first (lowest) price is used."""
     if not price_text:
         return None
 
-    # Remove currency symbols and non-numeric characters except decimal point
-    price_text = re.sub(r'[^\d.]', '', price_text.replace(',', ''))
+    # Take the first number, ignoring currency symbols and thousands separators
+    match = re.search(r'\d[\d,]*(?:\.\d+)?|\.\d+', price_text)
+    if not match:
+        return None
 
     try:
-        return float(price_text)
+        return float(match.group(0).replace(',', ''))
     except ValueError:
         return None
 
 
-async def notify_subscribers(item: Item, price_update: PriceUpdate) -> None:
+async def notify_subscribers(item: Item, price_update: PriceUpdate, timings: Optional[TimingStats] = None) -> None:
     """Send notifications to subscribers when a price drops."""
     if not item.subscribers:
         return
@@ -340,6 +1240,7 @@ async def notify_subscribers(item: Item, price_update: PriceUpdate) -> None:
             # Use affiliate link if available
             affiliate_url = dropped_link.affiliate_url if dropped_link and dropped_link.affiliate_url else None
 
+            started = time.perf_counter()
             await send_price_alert_email(
                 user.email,
                 item,
@@ -348,6 +1249,7 @@ async def notify_subscribers(item: Item, price_update: PriceUpdate) -> None:
                 price_update.percentage_change,
                 affiliate_url=affiliate_url
             )
+            record_stage(price_update.retailer, 'email', time.perf_counter() - started, timings)
 
             # Record that this user was notified
             price_update.users_notified.append({
@@ -0,0 +1,78 @@
+# app/utils/process_stats.py - Resource usage of API and worker processes
+
+import asyncio
+import os
+import resource
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from database.database import db
+from utils.leases import WORKER_ID
+
+# Latest usage report of every process, keyed by worker id
+status_collection = db.process_status
+
+# Reports older than this are treated as belonging to a stopped process
+STATUS_MAX_AGE_MINUTES = 10
+
+_started = time.time()
+
+
+def get_process_usage(role: str) -> Dict[str, Any]:
+    """
+    Get this process's resource usage.
+
+    Args:
+        role: What the process does, "api" or "worker"
+
+    Returns:
+        Dict with identity, uptime, CPU time, peak RSS, threads and asyncio tasks
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    try:
+        tasks = len(asyncio.all_tasks())
+    except RuntimeError:
+        tasks = 0
+
+    return {
+        "role": role,
+        "worker_id": WORKER_ID,
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - _started),
+        "cpu_user_seconds": round(usage.ru_utime, 2),
+        "cpu_system_seconds": round(usage.ru_stime, 2),
+        "max_rss_kb": usage.ru_maxrss,
+        "threads": threading.active_count(),
+        "asyncio_tasks": tasks
+    }
+
+
+async def publish_process_usage(role: str) -> None:
+    """Store this process's usage and job metrics so other processes can report them."""
+    from utils.jobs import get_job_stats
+    from utils.job_lock import get_job_lock_stats
+
+    await status_collection.update_one(
+        {"_id": WORKER_ID},
+        {"$set": {
+            **get_process_usage(role),
+            "jobs": get_job_stats(),
+            "job_locks": get_job_lock_stats(),
+            "updated_at": datetime.now()
+        }},
+        upsert=True
+    )
+
+
+async def get_recent_process_usage() -> List[Dict[str, Any]]:
+    """Get the latest usage report of every process that reported recently."""
+    cutoff = datetime.now() - timedelta(minutes=STATUS_MAX_AGE_MINUTES)
+    reports = await status_collection.find({"updated_at": {"$gte": cutoff}}).to_list(length=None)
+    for report in reports:
+        report.pop("_id", None)
+    return reports
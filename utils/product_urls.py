@@ -0,0 +1,95 @@
+# app/utils/product_urls.py - Canonical forms and product keys for retailer URLs
+
+import re
+from typing import Optional
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+# Query parameters that only carry tracking or affiliate information
+TRACKING_PARAMS = {
+    'ref', 'ref_', 'tag', 'linkcode', 'linkid', 'camp', 'creative', 'creativeasin',
+    'gclid', 'fbclid', 'msclkid', 'clickid', 'sourceid',
+    # Parameters added by our own affiliate link generators
+    'wmlspartner', 'afid', 'irclickid', 'mkrid', 'ir-affiliate', 'avantlink', 'awin', 'cj'
+}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a retailer URL so links to the same page compare equal.
+
+    Lowercases the host, drops "www.", the fragment, a trailing slash and
+    tracking/affiliate query parameters, and sorts what's left of the query.
+    """
+    parsed = urlparse(url.strip())
+
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+
+    path = parsed.path.rstrip('/') or '/'
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    )
+
+    return urlunparse(('https', host, path, '', urlencode(query), ''))
+
+
+# Patterns for the product identifier in each retailer's product URLs,
+# keyed by the retailer names used in AFFILIATE_PROCESSORS
+PRODUCT_KEY_PATTERNS = {
+    # ASIN: /dp/B00006JSUA, /gp/product/B00006JSUA, /gp/aw/d/B00006JSUA
+    'Amazon': [r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin)/([A-Z0-9]{10})(?:[/?]|$)'],
+    # Item id: /ip/lodge-skillet/10315342 or /ip/10315342
+    'Walmart': [r'/ip/(?:[^/]+/)?(\d+)(?:[/?]|$)'],
+    # TCIN: /p/pyrex-10pc-set/-/A-12345678
+    'Target': [r'/A-(\d+)(?:[/?]|$)'],
+    # SKU: /site/thinkpad/6501234.p or ?skuId=6501234
+    'Best Buy': [r'/(\d+)\.p(?:[/?]|$)', r'[?&]skuId=(\d+)'],
+    # Item number: /itm/123456789012 or /itm/slug/123456789012
+    'eBay': [r'/itm/(?:[^/]+/)?(\d+)(?:[/?]|$)'],
+    # Product id: /p/dewalt-drill/204279858
+    'Home Depot': [r'/p/(?:[^/]+/)?(\d+)(?:[/?]|$)'],
+    # Product id: /product/123456/nalgene-bottle
+    'REI': [r'/product/(\d+)(?:[/?]|$)'],
+    # Listing id: /listing/123456789/handmade-wallet
+    'Etsy': [r'/listing/(\d+)(?:[/?]|$)'],
+    # SKU: /furniture/pdp/some-chair-w001234567.html
+    'Wayfair': [r'/pdp/[^?]*-([a-z0-9]+)\.html', r'[?&]piid=(\d+)']
+}
+
+
+def extract_product_key(url: str, retailer: str) -> Optional[str]:
+    """
+    Get a retailer-independent key for the product a URL points at.
+
+    Args:
+        url: Product URL
+        retailer: Retailer name (Amazon, Walmart, etc.)
+
+    Returns:
+        str: Key such as "amazon:B00006JSUA", or None if the URL has no
+        recognizable product id (short links, search pages, unknown retailers)
+    """
+    patterns = PRODUCT_KEY_PATTERNS.get(retailer)
+    if not patterns:
+        return None
+
+    parsed = urlparse(url.strip())
+    target = parsed.path + ('?' + parsed.query if parsed.query else '')
+
+    for pattern in patterns:
+        match = re.search(pattern, target, re.IGNORECASE)
+        if match:
+            product_id = match.group(1)
+            # ASINs are case-sensitive upper case; other ids are normalized to lower case
+            product_id = product_id.upper() if retailer == 'Amazon' else product_id.lower()
+            return f"{retailer.lower().replace(' ', '_')}:{product_id}"
+
+    return None
+
+
+def link_key(url: str, retailer: str, product_key: Optional[str] = None) -> str:
+    """Key that identifies a link's product: its product key if known, else its canonical URL."""
+    return product_key or extract_product_key(url, retailer) or canonicalize_url(url)
@@ -0,0 +1,141 @@
+# app/utils/rate_limiter.py - Per-retailer token buckets for polite price checks
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+from utils.affiliate import AFFILIATE_PROCESSORS
+
+# Load environment variables
+load_dotenv()
+
+# Requests per second allowed for a retailer, before any backoff
+RETAILER_DEFAULT_RATE = float(os.getenv('RETAILER_DEFAULT_RATE', '2'))
+RETAILER_BURST = float(os.getenv('RETAILER_BURST', '4'))
+RETAILER_MIN_RATE = float(os.getenv('RETAILER_MIN_RATE', '0.05'))
+
+# Per-retailer overrides, e.g. "Amazon=0.5,Best Buy=1"
+RETAILER_RATE_OVERRIDES = os.getenv('RETAILER_RATE_LIMITS', 'Amazon=1')
+
+# Longest pause honoured from a Retry-After header, in seconds
+RETAILER_MAX_PAUSE = float(os.getenv('RETAILER_MAX_PAUSE', '300'))
+
+
+def parse_rate_overrides(value: str) -> Dict[str, float]:
+    """Parse "Name=rate,Name=rate" into a dict, ignoring malformed entries."""
+    rates = {}
+    for entry in value.split(','):
+        name, _, rate = entry.partition('=')
+        try:
+            rates[name.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+class TokenBucket:
+    """
+    Token bucket with additive-increase / multiplicative-decrease backoff.
+
+    Each request takes one token. Throttling responses and timeouts halve the
+    refill rate; every success nudges it back up towards the configured rate.
+    """
+
+    def __init__(self, rate: float, burst: float = RETAILER_BURST, min_rate: float = RETAILER_MIN_RATE):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.acquired = 0
+        self.throttled = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it. Waiters are served in order."""
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self.paused_until:
+                        await asyncio.sleep(self.paused_until - now)
+                        continue
+
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.acquired += 1
+                        return
+
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+    def record_success(self) -> None:
+        """Recover a tenth of the configured rate after a successful request."""
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+    def record_throttled(self, retry_after: Optional[float] = None) -> None:
+        """Halve the rate after a 429/503 or timeout, and honour Retry-After if given."""
+        self._refill()
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + min(retry_after, RETAILER_MAX_PAUSE))
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "tokens": round(self.tokens, 2),
+            "queue_depth": self.waiting,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1)
+        }
+
+
+# Buckets keyed by the retailer names used in AFFILIATE_PROCESSORS
+_rate_overrides = parse_rate_overrides(RETAILER_RATE_OVERRIDES)
+_buckets: Dict[str, TokenBucket] = {
+    name: TokenBucket(_rate_overrides.get(name, RETAILER_DEFAULT_RATE))
+    for name in AFFILIATE_PROCESSORS
+}
+
+
+def get_retailer_bucket(retailer: str) -> TokenBucket:
+    """Get the token bucket for a retailer, creating one for unknown retailers."""
+    if retailer not in _buckets:
+        _buckets[retailer] = TokenBucket(_rate_overrides.get(retailer, RETAILER_DEFAULT_RATE))
+    return _buckets[retailer]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds. HTTP-date values are ignored."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def get_rate_limiter_stats() -> Dict[str, Any]:
+    """
+    Get the current rate and queue depth for every retailer.
+
+    Returns:
+        Dict keyed by retailer name with bucket statistics
+    """
+    return {name: bucket.stats() for name, bucket in _buckets.items()}
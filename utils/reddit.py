@@ -13,6 +13,9 @@ from dotenv import load_dotenv
 from database.database import Item, PriceHistory, RetailerLink
 from utils.price_tracker import check_price_for_link
 from utils.affiliate import generate_affiliate_link
+from utils.job_lock import job_lock
+from utils.product_urls import extract_product_key
+from utils.short_links import is_short_link, resolve_short_link
 
 # Load environment variables
 load_dotenv()
@@ -31,9 +34,21 @@ async def fetch_reddit_items() -> Dict[str, int]:
     """
     Fetch posts from the BuyItForLife subreddit and save them to the database.
 
+    Only one replica ingests at a time; the others return immediately.
+
     Returns:
         Dict with counts of new and updated items
     """
+    async with job_lock("reddit_ingestion") as lock:
+        if lock is None:
+            print("Reddit ingestion is already running on another replica")
+            return {"new_items": 0, "updated_items": 0}
+
+        return await ingest_reddit_posts()
+
+
+async def ingest_reddit_posts() -> Dict[str, int]:
+    """Fetch and store the subreddit's top posts of the month."""
     try:
         # Use a background thread for Reddit API calls since they're blocking
         loop = asyncio.get_event_loop()
@@ -58,10 +73,14 @@ async def fetch_reddit_items() -> Dict[str, int]:
 
             if item:
                 # Update existing item
-                item.reddit_score = post.score
-                item.reddit_comments = post.num_comments
-                item.updated_at = datetime.now()
-                await item.save()
+                await Item.get_motor_collection().update_one(
+                    {"_id": item.id},
+                    {"$set": {
+                        "reddit_score": post.score,
+                        "reddit_comments": post.num_comments,
+                        "updated_at": datetime.now()
+                    }}
+                )
                 updated_items += 1
             else:
                 # Create new item
@@ -195,7 +214,8 @@ def extract_retailer_links(content: str) -> List[Dict[str, Any]]:
                     'last_checked': None,
                     'affiliate_enabled': True,
                     'affiliate_url': None,
-                    'affiliate_program': None
+                    'affiliate_program': None,
+                    'product_key': extract_product_key(url, retailer_name)
                 }
 
                 # Generate affiliate link
@@ -218,17 +238,27 @@ async def add_retailer_link(item_id: str, retailer_link: Dict[str, Any]) -> None
         if not item:
             return
 
-        # Check if link already exists
-        for link in item.retailer_links:
-            if link.url == retailer_link['url']:
-                return
-
         # Create new RetailerLink object
         new_link = RetailerLink(**retailer_link)
 
-        # Add to item
-        item.retailer_links.append(new_link)
-        await item.save()
+        # Store short links (amzn.to etc.) as the product page they redirect to
+        if is_short_link(new_link.url):
+            new_link.url = await resolve_short_link(new_link.url)
+            new_link.product_key = extract_product_key(new_link.url, new_link.name)
+            if new_link.affiliate_enabled:
+                new_link.affiliate_url = generate_affiliate_link(new_link.url, new_link.name)
+
+        # Add to item unless a link with the same URL or product already exists
+        link_filter = {"_id": item.id, "retailer_links.url": {"$ne": new_link.url}}
+        if new_link.product_key:
+            link_filter["retailer_links.product_key"] = {"$ne": new_link.product_key}
+
+        result = await Item.get_motor_collection().update_one(
+            link_filter,
+            {"$push": {"retailer_links": new_link.dict()}}
+        )
+        if result.modified_count == 0:
+            return
 
         # Schedule price check for this link
         await check_price_for_link(item_id, new_link)
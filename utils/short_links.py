@@ -0,0 +1,117 @@
+# app/utils/short_links.py - Resolve and cache retailer short links (amzn.to etc.)
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Union
+from urllib.parse import urlparse
+import aiohttp
+from dotenv import load_dotenv
+
+from database.database import db, Item, ItemPriceCheck, RetailerLink
+from utils.affiliate import generate_affiliate_link
+from utils.http_client import get_http_session
+from utils.product_urls import extract_product_key
+
+# Load environment variables
+load_dotenv()
+
+# Redirector domains whose links are resolved to the product page they point at
+SHORT_LINK_DOMAINS = {'amzn.to', 'a.co', 'amzn.eu', 'ebay.us', 'bit.ly', 'tinyurl.com'}
+
+# How long a resolved short link is trusted before it's followed again
+SHORT_LINK_TTL_DAYS = int(os.getenv('SHORT_LINK_TTL_DAYS', '30'))
+
+# Collection of resolved short links, keyed by short URL
+short_link_collection = db.short_links
+
+_stats = {"resolved": 0, "cache_hits": 0, "failed": 0, "links_rewritten": 0}
+
+
+def is_short_link(url: str) -> bool:
+    """Check whether a URL is on a known redirector domain."""
+    domain = urlparse(url).netloc.lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain in SHORT_LINK_DOMAINS
+
+
+async def resolve_short_link(url: str) -> str:
+    """
+    Follow a short link to its final URL, using the cache while it's fresh.
+
+    Returns:
+        str: The final URL, or the original URL if it isn't a short link or
+        couldn't be resolved
+    """
+    if not is_short_link(url):
+        return url
+
+    cached = await short_link_collection.find_one({"_id": url})
+    if cached and cached["resolved_at"] > datetime.now() - timedelta(days=SHORT_LINK_TTL_DAYS):
+        _stats["cache_hits"] += 1
+        return cached["final_url"]
+
+    try:
+        session = get_http_session()
+        timeout = aiohttp.ClientTimeout(total=10)
+
+        # Some redirectors reject HEAD, so fall back to GET without reading the body
+        async with session.head(url, allow_redirects=True, timeout=timeout) as response:
+            final_url = str(response.url)
+            status = response.status
+        if status >= 400:
+            async with session.get(url, allow_redirects=True, timeout=timeout) as response:
+                final_url = str(response.url)
+                status = response.status
+
+        if status >= 400 or is_short_link(final_url):
+            _stats["failed"] += 1
+            return url
+
+    except Exception as e:
+        print(f"Error resolving short link {url}: {e}")
+        _stats["failed"] += 1
+        return url
+
+    await short_link_collection.update_one(
+        {"_id": url},
+        {"$set": {"final_url": final_url, "resolved_at": datetime.now()}},
+        upsert=True
+    )
+    _stats["resolved"] += 1
+
+    return final_url
+
+
+async def rewrite_short_link(item: Union[Item, ItemPriceCheck], link: RetailerLink) -> None:
+    """
+    Point a stored retailer link at its resolved URL so later checks skip the
+    redirect hop, refreshing its product key, affiliate link and affiliate
+    program to match.
+    """
+    final_url = await resolve_short_link(link.url)
+    if final_url == link.url:
+        return
+
+    short_url = link.url
+    link.url = final_url
+    link.product_key = extract_product_key(final_url, link.name)
+    if link.affiliate_enabled:
+        link.affiliate_url = generate_affiliate_link(final_url, link.name)
+        link.affiliate_program = link.name.lower() if link.affiliate_url else None
+
+    await Item.get_motor_collection().update_one(
+        {"_id": item.id, "retailer_links.url": short_url},
+        {"$set": {
+            "retailer_links.$.url": link.url,
+            "retailer_links.$.product_key": link.product_key,
+            "retailer_links.$.affiliate_url": link.affiliate_url,
+            "retailer_links.$.affiliate_program": link.affiliate_program
+        }}
+    )
+    _stats["links_rewritten"] += 1
+
+
+def get_short_link_stats() -> Dict[str, Any]:
+    """Get counts of resolved, cached, failed and rewritten short links."""
+    return dict(_stats)
@@ -0,0 +1,136 @@
+# app/utils/structured_data.py - Fast price lookup in JSON-LD, OpenGraph and microdata
+
+import json
+import re
+from typing import Any, Optional, Tuple
+
+# Complete <script type="application/ld+json"> blocks
+JSON_LD_PATTERN = re.compile(
+    r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Opening tag of a JSON-LD block, and the closing tag JSON_LD_PATTERN ends at
+JSON_LD_OPEN_PATTERN = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>', re.IGNORECASE)
+SCRIPT_CLOSE_PATTERN = re.compile(r'</script>', re.IGNORECASE)
+
+# <meta property="og:price:amount" content="..."> in either attribute order.
+# Every pattern runs to the end of the tag, so a tag cut off by the end of a
+# partially downloaded page doesn't match.
+OPENGRAPH_PATTERNS = [
+    re.compile(r'<meta[^>]+property=["\'](?:og|product):price:amount["\'][^>]*content=["\']([^"\']+)["\'][^>]*>', re.IGNORECASE),
+    re.compile(r'<meta[^>]+content=["\']([^"\']+)["\'][^>]*property=["\'](?:og|product):price:amount["\'][^>]*>', re.IGNORECASE)
+]
+
+# <... itemprop="price" content="..."> in either attribute order
+MICRODATA_PATTERNS = [
+    re.compile(r'<[a-z]+[^>]+itemprop=["\']price["\'][^>]*content=["\']([^"\']+)["\'][^>]*>', re.IGNORECASE),
+    re.compile(r'<[a-z]+[^>]+content=["\']([^"\']+)["\'][^>]*itemprop=["\']price["\'][^>]*>', re.IGNORECASE)
+]
+
+
+def to_price(value: Any) -> Optional[float]:
+    """
+    Convert a structured-data price value such as "1,149.99" or 24.9 to a float.
+
+    Zero and negative prices give None: unavailable products are often listed
+    with a price of 0, which would otherwise read as a 100% drop.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        price = float(value)
+    elif isinstance(value, str):
+        cleaned = re.sub(r'[^\d.]', '', value.replace(',', ''))
+        try:
+            price = float(cleaned)
+        except ValueError:
+            return None
+    else:
+        return None
+
+    return price if price > 0 else None
+
+
+def find_offer_price(data: Any) -> Optional[float]:
+    """Walk a JSON-LD document for the first offer price (Offer.price or AggregateOffer.lowPrice)."""
+    if isinstance(data, list):
+        for entry in data:
+            price = find_offer_price(entry)
+            if price is not None:
+                return price
+        return None
+
+    if not isinstance(data, dict):
+        return None
+
+    if 'offers' in data:
+        price = find_offer_price(data['offers'])
+        if price is not None:
+            return price
+
+    if '@graph' in data:
+        price = find_offer_price(data['@graph'])
+        if price is not None:
+            return price
+
+    offer_type = data.get('@type')
+    if offer_type in ('Offer', 'AggregateOffer') or 'priceCurrency' in data:
+        for key in ('price', 'lowPrice'):
+            price = to_price(data.get(key))
+            if price is not None:
+                return price
+
+    return None
+
+
+def find_structured_price(html: str) -> Optional[Tuple[float, str]]:
+    """
+    Look for a price in the page's structured data without parsing the HTML.
+
+    Tags must be complete to match, down to the closing quote of the price
+    and the end of the tag, so a page cut off partway through one finds
+    nothing rather than a truncated price.
+
+    Returns:
+        Tuple of the price and the tier that found it ("json_ld", "opengraph"
+        or "microdata"), or None
+    """
+    for match in JSON_LD_PATTERN.finditer(html):
+        try:
+            data = json.loads(match.group(1))
+        except ValueError:
+            continue
+
+        price = find_offer_price(data)
+        if price is not None:
+            return price, 'json_ld'
+
+    for tier, patterns in (('opengraph', OPENGRAPH_PATTERNS), ('microdata', MICRODATA_PATTERNS)):
+        for pattern in patterns:
+            match = pattern.search(html)
+            if match:
+                price = to_price(match.group(1))
+                if price is not None:
+                    return price, tier
+
+    return None
+
+
+def unscanned_start(html: str) -> int:
+    """
+    Where to keep a partially downloaded page's text from before the next chunk is added.
+
+    An unclosed JSON-LD block is kept whole so it can match once its end
+    arrives; otherwise the text is kept from the last '<' so a split tag is
+    seen whole.
+
+    Returns:
+        Index into html, or len(html) if nothing needs keeping
+    """
+    last_block = None
+    for last_block in JSON_LD_OPEN_PATTERN.finditer(html):
+        pass
+    if last_block and not SCRIPT_CLOSE_PATTERN.search(html, last_block.end()):
+        return last_block.start()
+
+    cut = html.rfind('<')
+    return cut if cut != -1 else len(html)
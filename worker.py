@@ -0,0 +1,103 @@
+# worker.py - Standalone price check and Reddit ingestion worker
+#
+# Runs the scheduled jobs outside the API process so scraping doesn't compete
+# with request handling. Start one or more with:
+#
+#   python -m worker [--concurrency N] [--retailer-concurrency N] [--parse-workers N]
+#                    [--persist-workers N] [--notify-workers N] [--full-cycle]
+#
+# Several workers can run side by side; due items are leased (utils/leases.py).
+# With --full-cycle the worker checks every link once and exits instead.
+
+import argparse
+import asyncio
+import os
+import signal
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='BuyItForLife price check worker')
+    parser.add_argument('--concurrency', type=int,
+                        default=os.getenv('WORKER_PRICE_CHECK_CONCURRENCY'),
+                        help='Links fetched at once across all retailers')
+    parser.add_argument('--retailer-concurrency', type=int,
+                        default=os.getenv('WORKER_PRICE_CHECK_RETAILER_CONCURRENCY'),
+                        help='Links fetched at once per retailer')
+    parser.add_argument('--parse-workers', type=int,
+                        default=os.getenv('WORKER_PRICE_PARSE_WORKERS'),
+                        help='Processes used to parse product pages')
+    parser.add_argument('--persist-workers', type=int,
+                        default=os.getenv('WORKER_PRICE_PIPELINE_PERSIST_WORKERS'),
+                        help='Items written to the database at once')
+    parser.add_argument('--notify-workers', type=int,
+                        default=os.getenv('WORKER_PRICE_PIPELINE_NOTIFY_WORKERS'),
+                        help='Price drops notified at once')
+    parser.add_argument('--full-cycle', action='store_true',
+                        help='Run one full price check cycle now and exit')
+    return parser.parse_args()
+
+
+def apply_settings(args: argparse.Namespace) -> None:
+    """Override the shared settings before the modules that read them are imported."""
+    overrides = {
+        'PRICE_CHECK_CONCURRENCY': args.concurrency,
+        'PRICE_CHECK_RETAILER_CONCURRENCY': args.retailer_concurrency,
+        'PRICE_PARSE_WORKERS': args.parse_workers,
+        'PRICE_PIPELINE_PERSIST_WORKERS': args.persist_workers,
+        'PRICE_PIPELINE_NOTIFY_WORKERS': args.notify_workers
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            os.environ[name] = str(value)
+
+
+async def run_full_cycle() -> None:
+    from database.database import init_db
+    from utils.http_client import start_http_session, close_http_session
+    from utils.parse_pool import shutdown_parse_executor
+    from utils.price_tracker import check_prices_and_notify
+
+    await init_db()
+    await start_http_session()
+
+    try:
+        await check_prices_and_notify()
+    finally:
+        await close_http_session()
+        shutdown_parse_executor()
+
+
+async def run_worker() -> None:
+    from database.database import init_db
+    from utils.http_client import start_http_session, close_http_session
+    from utils.jobs import start_scheduler
+    from utils.parse_pool import shutdown_parse_executor
+
+    await init_db()
+    await start_http_session()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    scheduler = await start_scheduler("worker")
+    print("Price worker started")
+
+    try:
+        await stop.wait()
+    finally:
+        scheduler.shutdown(wait=False)
+        await close_http_session()
+        shutdown_parse_executor()
+        print("Price worker stopped")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    apply_settings(args)
+    asyncio.run(run_full_cycle() if args.full_cycle else run_worker())